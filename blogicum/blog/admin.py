@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from blog.cache import bump_generations, forget_post_cards
 from blog.models import Category, Location, Post, Comment
 
 
@@ -9,13 +10,25 @@ class PostAdmin(admin.ModelAdmin):
         'title',
         'is_published',
         'pub_date',
-        'category'
+        'category',
+        'comment_count'
     )
 
     list_editable = (
         'is_published',
     )
 
+    readonly_fields = ('comment_count',)
+
+    actions = ('recount_comments',)
+
+    @admin.action(description='Пересчитать комментарии')
+    def recount_comments(self, request, queryset):
+        queryset.recount_comments()
+        # QuerySet.update() sends no signals: cached counts go by hand.
+        forget_post_cards(queryset.values_list('pk', flat=True).iterator())
+        bump_generations('all')
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
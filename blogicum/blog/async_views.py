@@ -0,0 +1,56 @@
+"""Async variants of the read views for the ASGI deployment
+
+Django 3.2 has neither an async ORM nor async class-based views, so each
+variant is a coroutine running the sync view (rendering included, querysets
+are lazy) on a bounded thread pool. The event loop keeps slow clients off
+the threads; ASYNC_VIEW_THREADS bounds the database connections a worker
+process opens.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from blog import views
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEW_THREADS,
+            thread_name_prefix='async-views')
+    return _executor
+
+
+def async_variant(view_class):
+    view = view_class.as_view()
+
+    def render(request, *args, **kwargs):
+        # Pool threads are outside the request_started/finished signals.
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(
+            render, thread_sensitive=False, executor=executor()
+        )(request, *args, **kwargs)
+
+    async_view.view_class = view_class
+    async_view.__name__ = async_view.__qualname__ = view.__name__
+    return async_view
+
+
+post_list = async_variant(views.PostListView)
+category_post_list = async_variant(views.CategoryPostListView)
+profile_detail = async_variant(views.ProfileDetailView)
+post_detail = async_variant(views.PostDetailView)
@@ -0,0 +1,20 @@
+from django.contrib.auth.backends import ModelBackend
+
+from blog.cache import cache_user, get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend serving request.user from the cache
+
+    AuthenticationMiddleware looks the user up on every request; the
+    cached copy is dropped by blog.signals whenever the user is saved,
+    password and profile changes included.
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache_user(user)
+        return user if user and self.user_can_authenticate(user) else None
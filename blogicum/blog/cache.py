@@ -0,0 +1,160 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blog.publication import ttl_ceiling
+
+POST_CARD_TEMPLATE = 'includes/post_card.html'
+# Card markup depends on (post published, category published) flags.
+POST_CARD_FLAGS = ('11', '10', '01', '00')
+INVALIDATION_CHUNK = 1000
+# Validators travel with a cached page: a hit can still answer 304.
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+def post_card_key(pk, flags):
+    return f'post_card:{pk}:{flags}'
+
+
+def post_card_flags(post):
+    category = post.category
+    return '{:d}{:d}'.format(
+        post.is_published, category is not None and category.is_published)
+
+
+def render_post_cards(posts):
+    """Post cards html, rendered only for the posts missing in cache"""
+    keyed = [
+        (post_card_key(post.pk, post_card_flags(post)), post)
+        for post in posts
+    ]
+    cards = cache.get_many([key for key, _ in keyed])
+    rendered = {
+        key: render_to_string(POST_CARD_TEMPLATE, {'post': post})
+        for key, post in keyed if key not in cards
+    }
+    if rendered:
+        cache.set_many(
+            rendered, ttl_ceiling(settings.POST_CARD_CACHE_TIMEOUT))
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key, _ in keyed]
+
+
+def forget_post_cards(post_ids):
+    """Drop cached cards of the given posts (ids may be a lazy queryset)"""
+    keys = []
+    for pk in post_ids:
+        keys.extend(post_card_key(pk, flags) for flags in POST_CARD_FLAGS)
+        if len(keys) >= INVALIDATION_CHUNK:
+            cache.delete_many(keys)
+            keys = []
+    if keys:
+        cache.delete_many(keys)
+
+
+# Generations are nanosecond timestamps stored without expiry; bumping one
+# makes every cached page recorded with the previous value stale.
+def generation_key(scope):
+    return f'gen:{scope}'
+
+
+def bump_generations(*scopes):
+    now = time.time_ns()
+    cache.set_many({generation_key(scope): now for scope in scopes}, None)
+
+
+def init_generations(generations, keys):
+    """Start the missing generations at now, in place"""
+    for k in keys:
+        if generations.get(k) is None:
+            now = time.time_ns()
+            # Lost race with a bump: keep None so the entry never matches.
+            generations[k] = now if cache.add(k, now, None) else None
+    return generations
+
+
+def current_generations(scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    return init_generations(cache.get_many(keys), keys)
+
+
+def post_scope(pk):
+    return f'post:{pk}'
+
+
+def page_cache_key(request):
+    """Key by path and pagination parameters only"""
+    query = '&'.join(
+        f'{name}={request.GET.get(name)}'
+        for name in ('page', 'after', 'before') if name in request.GET
+    )
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'page:{digest}'
+
+
+def get_cached_page(key, scopes):
+    """Cached response if neither its scopes nor its posts changed since"""
+    scope_keys = [generation_key(scope) for scope in scopes]
+    found = cache.get_many([key, *scope_keys])
+    entry = found.pop(key, None)
+    init_generations(found, scope_keys)
+    if entry is None:
+        return None, found
+    generations = entry['generations']
+    if any(generations.get(k) != found.get(k) for k in scope_keys):
+        return None, found
+    post_keys = [k for k in generations if k not in scope_keys]
+    current = cache.get_many(post_keys)
+    if any(generations[k] != current.get(k) for k in post_keys):
+        return None, found
+    response = HttpResponse(
+        entry['content'], content_type=entry['content_type'])
+    for header, value in entry.get('headers', {}).items():
+        response[header] = value
+    return response, found
+
+
+def cache_page(key, scope_generations, scopes, post_ids, response):
+    """Store a rendered response with the generations it was built from.
+
+    ``scope_generations`` are the values read before the view ran, so a
+    change made while it was rendering leaves the entry already stale.
+    """
+    generations = {
+        generation_key(scope): scope_generations.get(generation_key(scope))
+        for scope in scopes
+    }
+    post_keys = [generation_key(post_scope(pk)) for pk in post_ids]
+    generations.update(cache.get_many(post_keys))
+    init_generations(generations, [*generations, *post_keys])
+    cache.set(key, {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'headers': {
+            header: response[header] for header in CACHED_HEADERS
+            if response.has_header(header)
+        },
+        'generations': generations,
+    }, ttl_ceiling(settings.PAGE_CACHE_TIMEOUT))
+
+
+def user_cache_key(pk):
+    return f'user:{pk}'
+
+
+def get_cached_user(pk):
+    return cache.get(user_cache_key(pk))
+
+
+def cache_user(user):
+    if settings.USER_CACHE_TIMEOUT:
+        cache.set(user_cache_key(user.pk), user, settings.USER_CACHE_TIMEOUT)
+
+
+def forget_user(pk):
+    cache.delete(user_cache_key(pk))
@@ -1,23 +1,53 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from PIL import Image
 
 from blog.models import Comment, Post
 
 User = get_user_model()
 
 
+class StreamedImageField(forms.ImageField):
+    """ImageField trusting a header BoundedImageUploadHandler has checked"""
+
+    def to_python(self, data):
+        upload = getattr(data, 'image_upload', None)
+        if upload is None:
+            return super().to_python(data)
+        # No second full read through Pillow: the upload was streamed past
+        # the header check already.
+        data = forms.FileField.to_python(self, data)
+        data.content_type = Image.MIME.get(upload.format)
+        return data
+
+
 class PostForm(forms.ModelForm):
 
-    def __init__(self, *args, **kwrags):
+    def __init__(self, *args, image_uploads=None, **kwrags):
         super().__init__(*args, **kwrags)
         self.fields['pub_date'].initial = timezone.localtime(
             timezone.now()
         ).strftime('%Y-%m-%dT%H:%M')
+        self.upload_errors = {}
+        for name, upload in (image_uploads or {}).items():
+            if upload.error:
+                self.upload_errors[name] = upload.error
+                self.files = self.files.copy()
+                self.files.pop(name, None)
+            elif name in self.files:
+                self.files[name].image_upload = upload
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, error in self.upload_errors.items():
+            self.add_error(name, error)
+        return cleaned_data
 
     class Meta:
         model = Post
         fields = ('title', 'text', 'image', 'location', 'category', 'pub_date')
+        field_classes = {'image': StreamedImageField}
         widgets = {
             'pub_date': forms.DateTimeInput(
                 format='%Y-%m-%dT%H:%M',
@@ -0,0 +1,152 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+
+from blog.cache import bump_generations, forget_post_cards, post_scope
+from blog.models import Post
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> max width; never upscaled past the original.
+RENDITIONS = (('thumbnail', 320), ('card', 640), ('full', 1280))
+# Preferred first; JPEG is the fallback every browser understands.
+FORMATS = tuple(
+    fmt for fmt, available in (
+        ('avif', features.check('avif')),
+        ('webp', features.check('webp')),
+        ('jpeg', True),
+    ) if available
+)
+QUALITY = {'avif': 60, 'webp': 80, 'jpeg': 85}
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='post-images')
+    return _executor
+
+
+def rendition_name(name, rendition, fmt):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return posixpath.join(
+        directory, 'renditions', f'{stem}_{rendition}.{extension}')
+
+
+def build_renditions(field_file):
+    """Decode once, resize largest to smallest and encode every format"""
+    storage = field_file.storage
+    with field_file.open('rb'), Image.open(field_file) as source:
+        # JPEG can decode straight at a reduced scale.
+        source.draft('RGB', (RENDITIONS[-1][1], RENDITIONS[-1][1] * 4))
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    width, height = image.size
+    sizes = []
+    for rendition, max_width in reversed(RENDITIONS):
+        if max_width < image.width:
+            image = image.resize(
+                (max_width, round(image.height * max_width / image.width)),
+                Image.LANCZOS)
+        elif sizes:
+            continue  # would only duplicate a bigger rendition
+        files = {}
+        for fmt in FORMATS:
+            name = rendition_name(field_file.name, rendition, fmt)
+            buffer = BytesIO()
+            # No exif/icc passed on: the re-encode strips all metadata.
+            image.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+            if storage.exists(name):
+                storage.delete(name)
+            files[fmt] = storage.save(name, ContentFile(buffer.getvalue()))
+        sizes.append({
+            'name': rendition,
+            'width': image.width,
+            'height': image.height,
+            'files': files,
+        })
+    return {
+        'source': field_file.name,
+        'width': width,
+        'height': height,
+        'sizes': sizes[::-1],
+    }
+
+
+def process_post_image(post_id, name):
+    """Worker task: store renditions unless the image changed meanwhile"""
+    try:
+        post = Post.objects.filter(pk=post_id, image=name).first()
+        if post is None:
+            return
+        renditions = build_renditions(post.image)
+        updated = Post.objects.filter(pk=post_id, image=name).update(
+            image_renditions=renditions)
+        if updated:
+            forget_post_cards([post_id])
+            bump_generations(post_scope(post_id))
+    except Exception:
+        logger.exception('Renditions of post %s (%s) failed', post_id, name)
+
+
+def process_in_worker(post_id, name):
+    try:
+        process_post_image(post_id, name)
+    finally:
+        # Pool threads live outside the request cycle: nobody else closes it.
+        connection.close()
+
+
+def schedule_post_image(post):
+    """Queue rendition building once the saving transaction commits"""
+    post_id, name = post.pk, post.image.name
+    if settings.IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: executor().submit(process_in_worker, post_id, name))
+    else:
+        transaction.on_commit(lambda: process_post_image(post_id, name))
+
+
+def picture(post, fallback='card'):
+    """<picture> sources per format plus the fallback JPEG, if ready"""
+    renditions = post.image_renditions or {}
+    # Renditions of a replaced image are stale until the worker is done.
+    if renditions.get('source') != post.image.name:
+        return None
+    storage = post.image.storage
+    sources = []
+    for fmt in FORMATS:
+        srcset = ', '.join(
+            f"{storage.url(size['files'][fmt])} {size['width']}w"
+            for size in renditions['sizes'] if fmt in size['files'])
+        if srcset:
+            sources.append({'type': f'image/{fmt}', 'srcset': srcset})
+    if not sources:
+        return None
+    sizes = renditions['sizes']
+    img = next((size for size in sizes if size['name'] == fallback), sizes[-1])
+    return {
+        'sources': sources[:-1],
+        'srcset': sources[-1]['srcset'],
+        'src': storage.url(img['files'][FORMATS[-1]]),
+        'width': img['width'],
+        'height': img['height'],
+    }
+
+
+def release_post_image(name):
+    """Give the storage a chance to drop a blob no post uses any more"""
+    storage = Post._meta.get_field('image').storage
+    if hasattr(storage, 'release'):
+        transaction.on_commit(lambda: storage.release(name))
@@ -0,0 +1,270 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import Comment, Post
+
+User = get_user_model()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(samples, percent):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[
+        percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every blog and pages URL with the test client (or a real '
+        'gunicorn process, WSGI or ASGI) and write p50/p95/p99 latency, '
+        'throughput, query count and response size as JSON. --sizes reseeds '
+        'the database (destructive).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='',
+            help='Comma separated post counts; runs seed_blog --clear for '
+                 'each. Without it the current data is measured.')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Measured requests per route')
+        parser.add_argument('--cold', action='store_true',
+                            help='Clear the cache before every request')
+        parser.add_argument(
+            '--server', choices=('client', 'wsgi', 'asgi'), default='client',
+            help='client: in-process test client (counts queries); '
+                 'wsgi: gunicorn blogicum.wsgi on a free local port; '
+                 'asgi: gunicorn blogicum.asgi with uvicorn workers and '
+                 'ASYNC_VIEWS=1')
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Requests in flight at once (wsgi/asgi only)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='gunicorn worker processes (wsgi/asgi)')
+        parser.add_argument('--output', default='-',
+                            help='JSON file, "-" for stdout')
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['server'] == 'client' and options['concurrency'] > 1:
+            raise CommandError('--concurrency needs --server wsgi or asgi.')
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        runs = []
+        for size in sizes or [None]:
+            if size is not None:
+                call_command('seed_blog', clear=True, posts=size,
+                             comments=size * 3, users=max(10, size // 100),
+                             stdout=self.stderr)
+            runs.append({
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'results': self.run(),
+            })
+        report = json.dumps({
+            'commit': self.commit(),
+            'server': options['server'],
+            'workers': options['workers'],
+            'concurrency': options['concurrency'],
+            'cold': options['cold'],
+            'runs': runs,
+        }, indent=2, ensure_ascii=False)
+        if options['output'] == '-':
+            self.stdout.write(report)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(report)
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ('git', 'rev-parse', 'HEAD'), cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def fixtures(self):
+        post = Post.published.select_related(
+            'author', 'category').order_by('-comment_count').first()
+        if post is None:
+            raise CommandError('No published posts: seed the database.')
+        return post, post.author
+
+    def routes(self, post, author):
+        """(name, method, url, data factory, logged in) for every route"""
+
+        def new_comment():
+            return Comment.objects.create(
+                post=post, author=author, text='bench')
+
+        comment = new_comment()
+        return [
+            ('index', 'get', reverse('blog:index'), None, False),
+            ('index_page_2', 'get', reverse('blog:index') + '?page=2',
+             None, False),
+            ('category', 'get', reverse(
+                'blog:category_posts', args=(post.category.slug,)),
+             None, False),
+            ('profile', 'get', reverse(
+                'blog:profile', args=(author.username,)), None, False),
+            ('profile_owner', 'get', reverse(
+                'blog:profile', args=(author.username,)), None, True),
+            ('search', 'get', reverse('blog:search') + '?q='
+             + urllib.parse.quote(post.title.split()[0]), None, False),
+            ('post_detail', 'get', reverse(
+                'blog:post_detail', args=(post.pk,)), None, True),
+            ('add_comment', 'post', reverse(
+                'blog:add_comment', args=(post.pk,)),
+             lambda: {'text': 'bench'}, True),
+            ('edit_comment', 'get', reverse(
+                'blog:edit_comment', args=(post.pk, comment.pk)), None, True),
+            ('edit_comment_submit', 'post', reverse(
+                'blog:edit_comment', args=(post.pk, comment.pk)),
+             lambda: {'text': 'bench edited'}, True),
+            ('delete_comment', 'post', lambda: reverse(
+                'blog:delete_comment', args=(post.pk, new_comment().pk)),
+             None, True),
+            ('about', 'get', reverse('pages:about'), None, False),
+            ('rules', 'get', reverse('pages:rules'), None, False),
+        ]
+
+    def run(self):
+        post, author = self.fixtures()
+        anonymous = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        logged_in = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        logged_in.force_login(author)
+        results = []
+        with self.server() as request:
+            for name, method, url, data, login in self.routes(post, author):
+                client = logged_in if login else anonymous
+
+                def measure(job):
+                    if self.options['cold']:
+                        cache.clear()
+                    return request(client, method, *job)
+
+                # Targets and payloads are made up front: the comments to
+                # delete are created here, not while the clock runs.
+                jobs = [
+                    (url() if callable(url) else url, data() if data else {})
+                    for _ in range(self.options['requests'] + 1)
+                ]
+                measure(jobs.pop())  # warm-up
+                started = time.perf_counter()
+                if self.options['concurrency'] > 1:
+                    with ThreadPoolExecutor(
+                            self.options['concurrency']) as pool:
+                        samples = list(pool.map(measure, jobs))
+                else:
+                    samples = [measure(job) for job in jobs]
+                wall = time.perf_counter() - started
+                timings, queries, sizes, statuses = zip(*samples)
+                results.append({
+                    'route': name,
+                    'method': method.upper(),
+                    'status': sorted(set(statuses)),
+                    'p50_ms': round(percentile(timings, 50), 3),
+                    'p95_ms': round(percentile(timings, 95), 3),
+                    'p99_ms': round(percentile(timings, 99), 3),
+                    'rps': round(len(jobs) / wall, 1),
+                    'queries': max(queries) if None not in queries else None,
+                    'bytes': max(sizes),
+                })
+        return results
+
+    @contextmanager
+    def server(self):
+        if self.options['server'] == 'client':
+            yield self.client_request
+            return
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        command = [sys.executable, '-m', 'gunicorn',
+                   '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(self.options['workers'])]
+        # Same key, or the session of the logged in client is rejected.
+        env = {**os.environ, 'SECRET_KEY': settings.SECRET_KEY}
+        if self.options['server'] == 'asgi':
+            command += ['--worker-class', 'uvicorn_worker.UvicornWorker',
+                        'blogicum.asgi']
+            env['ASYNC_VIEWS'] = '1'
+        else:
+            command.append('blogicum.wsgi')
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            self.wait_for(port)
+            self.base_url = f'http://127.0.0.1:{port}'
+            self.opener = urllib.request.build_opener(NoRedirect)
+            csrf_request = RequestFactory().get('/')
+            self.csrf_token = get_token(csrf_request)
+            self.csrf_cookie = csrf_request.META['CSRF_COOKIE']
+            yield self.http_request
+        finally:
+            process.terminate()
+            process.wait()
+
+    def wait_for(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('Server did not start.')
+
+    def client_request(self, client, method, url, data):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = (time.perf_counter() - started) * 1000
+        return (elapsed, len(captured.captured_queries),
+                len(response.content), response.status_code)
+
+    def http_request(self, client, method, url, data):
+        cookies = {
+            key: morsel.value for key, morsel in client.cookies.items()}
+        cookies[settings.CSRF_COOKIE_NAME] = self.csrf_cookie
+        body = None
+        if method == 'post':
+            body = urllib.parse.urlencode(data).encode()
+        request = urllib.request.Request(
+            self.base_url + url, data=body, headers={
+                'Cookie': '; '.join(f'{k}={v}' for k, v in cookies.items()),
+                'Host': settings.ALLOWED_HOSTS[0],
+                'X-CSRFToken': self.csrf_token,
+            })
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request) as response:
+                size, status = len(response.read()), response.status
+        except urllib.error.HTTPError as error:
+            size, status = len(error.read()), error.code
+        return (time.perf_counter() - started) * 1000, None, size, status
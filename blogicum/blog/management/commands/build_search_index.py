@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.search_engine import build_from_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Write a snapshot of the in-process search index (used without '
+        'PostgreSQL). Running processes map it on their next search.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.SEARCH_INDEX_PATH,
+            help='Snapshot file, SEARCH_INDEX_PATH by default')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Posts fetched per round trip')
+
+    def handle(self, *args, **options):
+        index = build_from_database(options['chunk_size'])
+        count = index.write(options['output'], index.changes)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} posts into {options['output']}."))
@@ -0,0 +1,62 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.models import Post
+from blog.storage import ContentAddressedStorage, blob_digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete content-addressed media blobs (and their renditions) that no '
+        'post references. Files with legacy names are left alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only list what would be deleted')
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Keep files modified less than this many seconds ago '
+                 '(default MEDIA_BLOB_GRACE)')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError(
+                'DEFAULT_FILE_STORAGE is not ContentAddressedStorage.')
+        grace = options['grace']
+        if grace is None:
+            grace = settings.MEDIA_BLOB_GRACE
+        referenced = set()
+        for name, renditions in Post.objects.exclude(image='').values_list(
+                'image', 'image_renditions').iterator():
+            referenced.add(blob_digest(name))
+            # Renditions of legacy images may have been stored as blobs.
+            for size in (renditions or {}).get('sizes', ()):
+                referenced.update(map(blob_digest, size['files'].values()))
+        removed = freed = 0
+        for name in self.blobs(default_storage):
+            if (blob_digest(name) in referenced
+                    or not default_storage.is_stale(name, grace)):
+                continue
+            removed += 1
+            freed += default_storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {removed} files, {freed / 1024 / 1024:.1f} MB.'))
+
+    def blobs(self, storage):
+        root = storage.path('')
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                name = os.path.relpath(
+                    os.path.join(directory, filename), root)
+                name = name.replace(os.sep, '/')
+                if blob_digest(name):
+                    yield name
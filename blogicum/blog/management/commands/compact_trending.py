@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Trunc
+
+from blog.models import Comment, CommentActivity
+from blog.trending import BUCKETS_KEY, bucket_of, compact, window_start
+
+
+class Command(BaseCommand):
+    help = (
+        'Drop trending counters that left the window (run periodically). '
+        'With --rebuild recount the window from the comments table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recount the buckets of the window from Comment rows')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.rebuild()
+        removed = compact()
+        cache.delete(BUCKETS_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {removed} trending counters.'))
+
+    def rebuild(self):
+        start = window_start()
+        # Grouped by minute in SQL, then into buckets of whole minutes.
+        rows = Comment.objects.filter(created_at__gte=start).annotate(
+            minute=Trunc('created_at', 'minute')
+        ).values('post_id', 'minute').annotate(total=Count('pk')).order_by()
+        counts = {}
+        for row in rows.iterator():
+            key = (row['post_id'], bucket_of(row['minute']))
+            counts[key] = counts.get(key, 0) + row['total']
+        with transaction.atomic():
+            CommentActivity.objects.filter(bucket__gte=start).delete()
+            CommentActivity.objects.bulk_create(
+                (CommentActivity(post_id=post_id, bucket=bucket, count=count)
+                 for (post_id, bucket), count in counts.items()),
+                batch_size=5000)
+        self.stdout.write(f'Recounted {len(counts)} trending counters.')
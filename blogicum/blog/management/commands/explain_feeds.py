@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+
+from blog.models import Comment, Post
+
+FEED_INDEXES = (
+    (Post, 'post_published_feed_idx'),
+    (Post, 'post_category_feed_idx'),
+    (Post, 'post_author_feed_idx'),
+    (Comment, 'comment_post_created_idx'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the feed queries of the blog views. With --compare the '
+        'feed indexes are dropped inside a rolled back transaction to show '
+        'the plans without them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Run EXPLAIN ANALYZE (executes the queries)')
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Also show the plans without the feed indexes')
+
+    def feed_queries(self):
+        sample = Post.objects.order_by('-pk').values(
+            'pk', 'category_id', 'author_id').first()
+        if sample is None:
+            raise CommandError('No posts: seed the database first.')
+        order = ('-pub_date', '-id')
+        query = SearchQuery(
+            'город', config=settings.SEARCH_CONFIG, search_type='websearch')
+        return {
+            'index': Post.published.select_related(
+                'category', 'location', 'author').order_by(*order),
+            'category': Post.published.filter(
+                category_id=sample['category_id']).order_by(*order),
+            'profile': Post.objects.filter(
+                author_id=sample['author_id']).order_by(*order),
+            'comments': Comment.objects.filter(
+                post_id=sample['pk']).order_by('created_at', 'id'),
+            'search': Post.published.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            ).order_by('-rank', '-id'),
+        }
+
+    def explain(self, title, analyze):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, queryset in self.feed_queries().items():
+            plan = queryset[:settings.PAGE_COUNT].explain(analyze=analyze)
+            scan = 'seq scan' if 'Seq Scan' in plan else 'index scan'
+            self.stdout.write(self.style.SUCCESS(f'{name}: {scan}'))
+            self.stdout.write(plan)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Plans are only meaningful on PostgreSQL.')
+        self.explain('With feed indexes', options['analyze'])
+        if not options['compare']:
+            return
+        with transaction.atomic():
+            with connection.schema_editor(atomic=False) as editor:
+                for model, name in FEED_INDEXES:
+                    index = next(
+                        i for i in model._meta.indexes if i.name == name)
+                    editor.remove_index(model, index)
+            self.explain('Without feed indexes', options['analyze'])
+            transaction.set_rollback(True)
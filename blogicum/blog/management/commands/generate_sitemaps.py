@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.sitemaps import generate
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the sitemap index and its shards to SITEMAP_ROOT (run '
+        'periodically); only shards whose URLs changed are rewritten.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=None,
+            help='Directory of the sitemap files (default SITEMAP_ROOT)')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rewrite every shard, changed or not')
+
+    def handle(self, *args, **options):
+        root = options['output'] or settings.SITEMAP_ROOT
+        written, kept, removed = generate(root, force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Sitemaps in {root}: {written} written, {kept} unchanged, '
+            f'{removed} removed.'))
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from blog.images import process_in_worker, process_post_image
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Build responsive renditions for post images uploaded before the '
+        'pipeline existed (or all of them with --all).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild renditions that are already there')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_renditions={})
+        jobs = list(posts.values_list('pk', 'image'))
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                list(pool.map(lambda job: process_in_worker(*job), jobs))
+        else:
+            for job in jobs:
+                process_post_image(*job)
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(jobs)} images.'))
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions in small batches, unlike clearsessions '
+        'with its single DELETE that locks and bloats a big table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+            raise CommandError(
+                f'{settings.SESSION_ENGINE} keeps no sessions in the '
+                'database.')
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(Session.objects.filter(
+                expire_date__lt=now).values_list(
+                    'session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired sessions.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from blog.cache import bump_generations, forget_post_cards
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Post.comment_count from the comments table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Posts updated per transaction (by primary key range)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write('No posts.')
+            return
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                updated += Post.objects.filter(
+                    pk__gte=start, pk__lt=start + batch_size
+                ).recount_comments()
+            # QuerySet.update() sends no signals: cached counts go by hand.
+            forget_post_cards(range(start, start + batch_size))
+        bump_generations('all')
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted comments for {updated} posts.'))
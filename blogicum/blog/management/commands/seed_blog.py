@@ -0,0 +1,246 @@
+import csv
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.models import Category, Comment, CommentActivity, Location, Post
+from blog.publication import refresh_next_publication
+
+User = get_user_model()
+
+SEED_PREFIX = 'seed'
+WORDS = (
+    'блог путешествие город море горы утро вечер дорога книга кофе '
+    'история музей поезд река лес друзья праздник погода осень зима '
+    'весна лето фото прогулка рецепт ужин концерт выставка парк мост'
+).split()
+NULL = r'\N'
+
+
+@contextmanager
+def given_timestamps(model, obj):
+    """Keep the auto_now_add values ``obj`` carries instead of now"""
+    fields = [
+        field for field in model._meta.local_concrete_fields
+        if getattr(field, 'auto_now_add', False)
+        and getattr(obj, field.attname) is not None
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with deterministic synthetic blog data for load '
+        'testing. Uses COPY on PostgreSQL and bulk_create elsewhere.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--locations', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--future-fraction', type=float, default=0.05,
+            help='Share of posts with pub_date in the next 30 days')
+        parser.add_argument(
+            '--unpublished-fraction', type=float, default=0.05,
+            help='Share of posts with is_published=False')
+        parser.add_argument(
+            '--unpublished-category-fraction', type=float, default=0.1,
+            help='Share of categories with is_published=False')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Remove all blog rows and previously seeded users first')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.use_copy = connection.vendor == 'postgresql'
+        if options['clear']:
+            self.clear()
+
+        users = self.seed_users(options['users'])
+        categories = self.seed_categories(
+            options['categories'], options['unpublished_category_fraction'])
+        locations = self.seed_locations(options['locations'])
+        posts = self.seed_posts(
+            options['posts'], users, categories, locations,
+            options['future_fraction'], options['unpublished_fraction'])
+        self.seed_comments(options['comments'], users, posts)
+
+        call_command('recount_comments', batch_size=self.batch_size * 10,
+                     stdout=self.stdout)
+        call_command('update_search_vectors',
+                     batch_size=self.batch_size * 10, stdout=self.stdout)
+        call_command('compact_trending', rebuild=True, stdout=self.stdout)
+        # Rows went in without signals: nothing cached is trustworthy.
+        cache.clear()
+        refresh_next_publication()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {len(categories)} categories, '
+            f'{len(locations)} locations, {len(posts)} posts, '
+            f"{options['comments']} comments."))
+
+    def clear(self):
+        tables = [
+            model._meta.db_table
+            for model in (CommentActivity, Comment, Post, Category, Location)
+        ]
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                cursor.execute(
+                    f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+            else:
+                for table in tables:
+                    cursor.execute(f'DELETE FROM {table}')
+        User.objects.filter(
+            username__startswith=f'{SEED_PREFIX}_').delete()
+
+    def words(self, low, high):
+        return ' '.join(
+            self.random.choices(WORDS, k=self.random.randint(low, high)))
+
+    def past(self, days=365):
+        return self.now - timedelta(
+            seconds=self.random.randint(60, days * 24 * 60 * 60))
+
+    def seed_users(self, count):
+        password = make_password(SEED_PREFIX)
+        start = User.objects.filter(
+            username__startswith=f'{SEED_PREFIX}_').count()
+        User.objects.bulk_create(
+            (User(username=f'{SEED_PREFIX}_{start + i}', password=password,
+                  date_joined=self.past())
+             for i in range(count)),
+            batch_size=self.batch_size)
+        return list(User.objects.filter(
+            username__startswith=f'{SEED_PREFIX}_').values_list(
+                'pk', flat=True))
+
+    def seed_categories(self, count, unpublished_fraction):
+        start = Category.objects.count()
+        Category.objects.bulk_create(
+            Category(
+                title=self.words(1, 3).capitalize(),
+                description=self.words(5, 15),
+                slug=f'{SEED_PREFIX}-{start + i}',
+                is_published=self.random.random() >= unpublished_fraction,
+            )
+            for i in range(count)
+        )
+        return list(Category.objects.values_list('pk', flat=True))
+
+    def seed_locations(self, count):
+        Location.objects.bulk_create(
+            Location(name=self.words(1, 2).capitalize())
+            for _ in range(count)
+        )
+        return list(Location.objects.values_list('pk', flat=True))
+
+    def seed_posts(self, count, users, categories, locations,
+                   future_fraction, unpublished_fraction):
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        rows = (
+            Post(
+                title=self.words(2, 6).capitalize(),
+                text=self.words(20, 120),
+                pub_date=(
+                    self.now + timedelta(minutes=self.random.randint(
+                        1, 30 * 24 * 60))
+                    if self.random.random() < future_fraction
+                    else self.past()
+                ),
+                author_id=self.random.choice(users),
+                location_id=(
+                    self.random.choice(locations)
+                    if locations and self.random.random() < 0.8 else None),
+                category_id=self.random.choice(categories),
+                is_published=self.random.random() >= unpublished_fraction,
+            )
+            for _ in range(count)
+        )
+        self.insert(Post, rows)
+        return list(Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', 'pub_date'))
+
+    def seed_comments(self, count, users, posts):
+        if not posts:
+            return
+        self.insert(Comment, (
+            self.comment(*self.random.choice(posts), users)
+            for _ in range(count)
+        ))
+
+    def comment(self, post_id, pub_date, users):
+        """A comment written between publication (or now) and now"""
+        start = min(pub_date, self.now)
+        return Comment(
+            text=self.words(3, 30),
+            post_id=post_id,
+            author_id=self.random.choice(users),
+            created_at=start + timedelta(seconds=self.random.randint(
+                0, int((self.now - start).total_seconds()))),
+        )
+
+    def insert(self, model, objs):
+        """Insert in batches: COPY on PostgreSQL, bulk_create elsewhere"""
+        batch = []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self.insert_batch(model, batch)
+                batch = []
+        if batch:
+            self.insert_batch(model, batch)
+
+    def insert_batch(self, model, batch):
+        with given_timestamps(model, batch[0]):
+            if self.use_copy:
+                self.copy_batch(model, batch)
+            else:
+                model.objects.bulk_create(batch)
+
+    def copy_batch(self, model, batch):
+        fields = [
+            field for field in model._meta.local_concrete_fields
+            if not field.primary_key
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in batch:
+            writer.writerow(
+                NULL if value is None else value
+                for value in (
+                    field.get_db_prep_save(
+                        field.pre_save(obj, add=True), connection)
+                    for field in fields
+                )
+            )
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {model._meta.db_table} ({columns}) '
+                f"FROM STDIN WITH (FORMAT csv, NULL '{NULL}')",
+                buffer)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Post.search_vector (after bulk loads that skip signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Posts updated per transaction (by primary key range)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write('Not PostgreSQL: search runs in process.')
+            return
+        batch_size = options['batch_size']
+        bounds = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write('No posts.')
+            return
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                updated += Post.objects.filter(
+                    pk__gte=start, pk__lt=start + batch_size
+                ).update_search_vector()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated search vectors of {updated} posts.'))
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('blog.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more SQL queries than QUERY_BUDGETS allows"""
+
+
+class QueryStats:
+    """connection.execute_wrapper counting queries and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+# Stats of the request being served; asgiref copies it into the threads
+# running sync code, so async views are counted wherever their SQL runs.
+current_stats = ContextVar('query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def watch_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(watch_connection)
+
+
+class QueryBudgetMiddleware:
+    """Per-request query count/time: Server-Timing, logs and budgets"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Same marker MiddlewareMixin sets for the ASGI handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        # Opened before this module was imported: no connection_created.
+        watch_connection(connection)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.check(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.check(request, response, stats)
+
+    def check(self, request, response, stats):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        duration = stats.duration * 1000
+        response['Server-Timing'] = (
+            f'db;dur={duration:.1f};desc="{stats.count} queries"')
+        details = {
+            'view': view_name,
+            'queries': stats.count,
+            'db_ms': round(duration, 1),
+            'status': response.status_code,
+        }
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None or stats.count <= budget:
+            logger.info('view=%(view)s queries=%(queries)d '
+                        'db_ms=%(db_ms)s', details, extra=details)
+            return response
+        details['budget'] = budget
+        logger.warning('view=%(view)s queries=%(queries)d over budget '
+                       '%(budget)d', details, extra=details)
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f'{view_name} ran {stats.count} queries, budget {budget}')
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk'))
+    Post.objects.update(comment_count=Coalesce(
+        Subquery(comments.values('total')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_post_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Количество комментариев, обновляется автоматически', verbose_name='Комментарии'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
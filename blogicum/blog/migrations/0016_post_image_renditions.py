@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Уменьшенные копии изображения, создаются автоматически', verbose_name='Версии изображения'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.16 on 2026-10-18 05:18
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_INDEX = 'post_search_vector_idx'
+
+
+def create_search_index(apps, schema_editor):
+    """Fill search_vector and GIN-index it; other databases search in process"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(search_vector=(
+        SearchVector('title', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=settings.SEARCH_CONFIG)
+    ))
+    schema_editor.execute(
+        f'CREATE INDEX {SEARCH_INDEX} ON {Post._meta.db_table} '
+        'USING gin (search_vector)')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_post_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.16 on 2026-10-18 05:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Интервал длиной TRENDING_BUCKET секунд', verbose_name='Начало интервала')),
+                ('count', models.IntegerField(default=0, help_text='Комментарии, оставленные за интервал', verbose_name='Комментарии')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_activity', to='blog.post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'активность обсуждения',
+                'verbose_name_plural': 'Активность обсуждений',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='commentactivity',
+            constraint=models.UniqueConstraint(fields=('bucket', 'post'), name='comment_activity_bucket_post'),
+        ),
+    ]
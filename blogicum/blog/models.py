@@ -1,9 +1,43 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 User = get_user_model()
 
+_deleting = threading.local()
+
+
+@contextmanager
+def post_deletion():
+    """Scope of a Post delete in this thread, see is_deleting_post()
+
+    The marks go with the scope, whether the delete succeeded or not.
+    """
+    scopes = _deleting.__dict__.setdefault('scopes', [])
+    scopes.append(set())
+    try:
+        yield
+    finally:
+        scopes.pop()
+
+
+def mark_deleting_post(pk):
+    scopes = getattr(_deleting, 'scopes', None)
+    if scopes:
+        scopes[-1].add(pk)
+
+
+def is_deleting_post(pk):
+    """The post is being deleted, its comments with it, in this thread"""
+    return any(pk in scope for scope in getattr(_deleting, 'scopes', ()))
+
 
 class Location(models.Model):
     name = models.CharField(
@@ -57,15 +91,58 @@ class Category(models.Model):
         return self.title
 
 
+def published_filter():
+    """Condition for a post to be visible to everybody"""
+    return models.Q(
+        is_published=True,
+        pub_date__lte=timezone.now(),
+        category__is_published=True
+    )
+
+
+def post_search_vector():
+    """Title (weight A) and text (weight B) stemmed for full-text search"""
+    return (
+        SearchVector('title', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=settings.SEARCH_CONFIG)
+    )
+
+
+class PostQuerySet(models.QuerySet):
+
+    def published(self):
+        return self.filter(published_filter())
+
+    def visible_to(self, user):
+        """Published posts plus, for a logged in user, their own posts"""
+        if user.is_authenticated:
+            return self.filter(published_filter() | models.Q(author=user))
+        return self.published()
+
+    def delete(self):
+        with post_deletion():
+            return super().delete()
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def recount_comments(self):
+        """Rebuild the denormalized comment_count in a single UPDATE"""
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(total=Count('pk'))
+        return self.update(comment_count=Coalesce(
+            Subquery(comments.values('total')), 0))
+
+    def update_search_vector(self):
+        """Recompute search_vector in a single UPDATE (PostgreSQL only)"""
+        return self.update(search_vector=post_search_vector())
+
+
 class PublishedManager(models.Manager):
     """Manager for published posts only."""
 
     def get_queryset(self):
-        return super().get_queryset().filter(
-            is_published=True,
-            pub_date__lte=timezone.now(),
-            category__is_published=True
-        )
+        return PostQuerySet(self.model, using=self._db).published()
 
 
 class Post(models.Model):
@@ -111,18 +188,46 @@ class Post(models.Model):
                               upload_to='posts_images',
                               blank=True,
                               help_text='Выберите изображение')
+    image_renditions = models.JSONField(
+        default=dict, blank=True, editable=False,
+        verbose_name='Версии изображения',
+        help_text='Уменьшенные копии изображения, создаются автоматически'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Комментарии',
+        help_text='Количество комментариев, обновляется автоматически'
+    )
+    # GIN-indexed on PostgreSQL, kept up to date by a post_save signal.
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
-    objects = models.Manager()
+    objects = PostQuerySet.as_manager()
     published = PublishedManager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date', )
+        indexes = (
+            # PublishedManager feeds: only is_published rows are indexed.
+            models.Index(fields=('-pub_date', '-id'),
+                         condition=models.Q(is_published=True),
+                         name='post_published_feed_idx'),
+            models.Index(fields=('category', '-pub_date', '-id'),
+                         condition=models.Q(is_published=True),
+                         name='post_category_feed_idx'),
+            # Author profile shows unpublished posts to the owner.
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_feed_idx'),
+        )
 
     def __str__(self):
         return self.title
 
+    def delete(self, *args, **kwargs):
+        with post_deletion():
+            return super().delete(*args, **kwargs)
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -153,6 +258,40 @@ class Comment(models.Model):
         ordering = ('created_at',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(fields=('post', 'created_at', 'id'),
+                         name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         return self.text
+
+
+class CommentActivity(models.Model):
+    """Comments a post received within one time bucket (for trending)"""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='comment_activity',
+        verbose_name='Публикация'
+    )
+    bucket = models.DateTimeField(
+        verbose_name='Начало интервала',
+        help_text='Интервал длиной TRENDING_BUCKET секунд'
+    )
+    count = models.IntegerField(
+        default=0, verbose_name='Комментарии',
+        help_text='Комментарии, оставленные за интервал'
+    )
+
+    class Meta:
+        verbose_name = 'активность обсуждения'
+        verbose_name_plural = 'Активность обсуждений'
+        constraints = (
+            models.UniqueConstraint(fields=('bucket', 'post'),
+                                    name='comment_activity_bucket_post'),
+        )
+
+    def __str__(self):
+        return f'{self.post_id} @ {self.bucket:%Y-%m-%d %H:%M}: {self.count}'
@@ -0,0 +1,140 @@
+from django.db.models import Q
+from django.http import Http404
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class CursorPage:
+    """One page of keyset pagination (no total count, no page numbers)"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator over a pair of ordering fields.
+
+    ``ordering`` is a pair like ``('-pub_date', '-id')``: the first field
+    may repeat, the second one must be unique. ``after`` moves forward in
+    that order (older posts for the feed), ``before`` moves backward.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def encode_cursor(self, obj):
+        raw = '|'.join(
+            getattr(obj, name).isoformat()
+            if hasattr(getattr(obj, name), 'isoformat')
+            else str(getattr(obj, name))
+            for name in self.fields
+        )
+        return urlsafe_base64_encode(raw.encode())
+
+    def field(self, name):
+        """Model field or annotation (a search rank e.g.) ordered by"""
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, token):
+        try:
+            raw = force_str(urlsafe_base64_decode(token)).split('|')
+            if len(raw) != len(self.fields):
+                raise ValueError
+            values = [
+                self.field(name).to_python(value)
+                for name, value in zip(self.fields, raw)
+            ]
+        except Exception:
+            raise Http404('Неверный курсор страницы.')
+        if None in values:
+            raise Http404('Неверный курсор страницы.')
+        return values
+
+    def _seek(self, values, forward):
+        (first, second), (value, tie) = self.fields, values
+        descending = self.ordering[0].startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        return (
+            Q(**{f'{first}__{lookup}': value})
+            | Q(**{first: value, f'{second}__{lookup}': tie})
+        )
+
+    def window(self, after=None, before=None):
+        """Unevaluated queryset of the rows page() would return"""
+        if before:
+            reverse = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering
+            ]
+            return self.queryset.filter(
+                self._seek(self.decode_cursor(before), False)
+            ).order_by(*reverse)[:self.per_page]
+        queryset = self.queryset
+        if after:
+            queryset = queryset.filter(
+                self._seek(self.decode_cursor(after), True))
+        return queryset.order_by(*self.ordering)[:self.per_page]
+
+    def page(self, after=None, before=None):
+        queryset = self.queryset
+        size = self.per_page
+        if before:
+            reverse = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering
+            ]
+            rows = list(
+                queryset.filter(self._seek(self.decode_cursor(before), False))
+                .order_by(*reverse)[:size + 1]
+            )
+            has_more = len(rows) > size
+            rows = rows[:size][::-1]
+            if not rows:
+                return CursorPage(rows)
+            return CursorPage(
+                rows,
+                next_cursor=self.encode_cursor(rows[-1]),
+                previous_cursor=self.encode_cursor(rows[0]) if has_more
+                else None,
+            )
+        if after:
+            queryset = queryset.filter(
+                self._seek(self.decode_cursor(after), True))
+        rows = list(queryset.order_by(*self.ordering)[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if not rows:
+            return CursorPage(rows)
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_more else None,
+            previous_cursor=self.encode_cursor(rows[0]) if after else None,
+        )
@@ -0,0 +1,63 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import Min
+from django.dispatch import Signal
+from django.utils import timezone
+
+from blog.models import Post
+
+NEXT_PUBLICATION_KEY = 'next_publication'
+NOTHING_SCHEDULED = 'none'
+
+# Sent once per crossing with ``posts``: deferred posts that just went live.
+post_published = Signal()
+
+
+def scheduled_posts():
+    """Posts that PublishedManager will start showing later"""
+    return Post.objects.filter(
+        is_published=True,
+        category__is_published=True,
+        pub_date__gt=timezone.now(),
+    )
+
+
+def refresh_next_publication():
+    """Recompute the earliest future pub_date (on Post/Category changes)"""
+    next_pub_date = scheduled_posts().aggregate(
+        next=Min('pub_date'))['next']
+    cache.set(NEXT_PUBLICATION_KEY, next_pub_date or NOTHING_SCHEDULED, None)
+    return next_pub_date
+
+
+def next_publication():
+    """Moment the next deferred post becomes visible, None if none"""
+    value = cache.get(NEXT_PUBLICATION_KEY)
+    if value is None:
+        return refresh_next_publication()
+    if value == NOTHING_SCHEDULED:
+        return None
+    return value
+
+
+def publish_due(boundary):
+    """Announce the posts that crossed ``boundary``, once across workers"""
+    if cache.add(f'published:{boundary.timestamp()}', True, 60 * 60):
+        posts = list(Post.published.filter(
+            pub_date__gte=boundary).select_related('category', 'author'))
+        if posts:
+            post_published.send(sender=Post, posts=posts)
+    return refresh_next_publication()
+
+
+def ttl_ceiling(timeout):
+    """Clamp a cache timeout so it ends when the next deferred post is out"""
+    next_pub_date = next_publication()
+    now = timezone.now()
+    if next_pub_date is not None and next_pub_date <= now:
+        next_pub_date = publish_due(next_pub_date)
+    if next_pub_date is None:
+        return timeout
+    seconds = math.ceil((next_pub_date - now).total_seconds())
+    return max(1, min(timeout, seconds))
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank)
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.http import Http404
+from django.utils.encoding import force_str
+from django.utils.html import escape
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.safestring import mark_safe
+
+from blog.models import Post
+from blog.paginators import CursorPage, CursorPaginator
+from blog.search_engine import shared_index, tokenize
+
+# Control characters never typed in a post: escaped text keeps them.
+START_SEL, STOP_SEL = '\x02', '\x03'
+HEADLINE_WORDS = 30
+
+
+def highlight(headline):
+    """Escaped headline with the matched words in <mark>"""
+    return mark_safe(
+        escape(headline)
+        .replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>'))
+
+
+def search_posts(text, per_page, after=None):
+    """Published posts matching ``text``, best first, with post.headline"""
+    if connection.vendor == 'postgresql':
+        return search_postgresql(text, per_page, after)
+    return search_in_process(text, per_page, after)
+
+
+def search_postgresql(text, per_page, after=None):
+    query = SearchQuery(
+        text, config=settings.SEARCH_CONFIG, search_type='websearch')
+    # float8: a rank read back from a cursor compares equal to itself.
+    queryset = Post.published.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+    ).select_related('category', 'location', 'author')
+    page = CursorPaginator(
+        queryset, per_page, ('-rank', '-id')).page(after=after)
+    # ts_headline reparses the text: only for the rows on the page.
+    headlines = dict(Post.objects.filter(
+        pk__in=[post.pk for post in page]
+    ).annotate(headline=SearchHeadline(
+        'text', query, config=settings.SEARCH_CONFIG,
+        start_sel=START_SEL, stop_sel=STOP_SEL,
+        max_words=HEADLINE_WORDS, min_words=HEADLINE_WORDS // 2,
+        max_fragments=2, fragment_delimiter=' ... ',
+    )).values_list('pk', 'headline'))
+    for post in page:
+        post.headline = highlight(headlines.get(post.pk, ''))
+    return page
+
+
+def text_headline(text, tokens):
+    words = text.split()
+    matched = {
+        i for i, word in enumerate(words)
+        if set(tokenize(word)) & tokens
+    }
+    start = max(0, min(matched, default=0) - HEADLINE_WORDS // 3)
+    return ' '.join(
+        f'{START_SEL}{word}{STOP_SEL}' if i in matched else word
+        for i, word in enumerate(
+            words[start:start + HEADLINE_WORDS], start))
+
+
+def encode_cursor(score, pk):
+    return urlsafe_base64_encode(f'{score!r}|{pk}'.encode())
+
+
+def decode_cursor(token):
+    try:
+        score, pk = force_str(urlsafe_base64_decode(token)).split('|')
+        return float(score), int(pk)
+    except Exception:
+        raise Http404('Неверный курсор страницы.')
+
+
+def search_in_process(text, per_page, after=None):
+    """Ranked by the in-process BM25 index, hydrated via Post.published"""
+    ranked = shared_index().search(
+        text, below=decode_cursor(after) if after else None)
+    tokens = set(tokenize(text))
+    object_list, position = [], 0
+    # Posts hidden since they were indexed are skipped, not counted; twice
+    # the page is fetched so that a few of them cost no extra round trip.
+    while len(object_list) < per_page and position < len(ranked):
+        rows = ranked[position:position + per_page * 2]
+        posts = Post.published.select_related(
+            'category', 'location', 'author'
+        ).in_bulk([pk for _, pk in rows])
+        for score, pk in rows:
+            position += 1
+            post = posts.get(pk)
+            if post is not None:
+                post.rank = score
+                post.headline = highlight(text_headline(post.text, tokens))
+                object_list.append(post)
+                if len(object_list) == per_page:
+                    break
+    return CursorPage(
+        object_list,
+        next_cursor=encode_cursor(*ranked[position - 1])
+        if position < len(ranked) else None,
+        previous_cursor=encode_cursor(*ranked[0]) if after and ranked
+        else None,
+    )
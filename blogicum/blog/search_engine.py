@@ -0,0 +1,386 @@
+"""In-process BM25 search over posts for databases without full-text search
+
+Posts get internal document numbers that only grow: an edit retires the
+old number and appends a new one, so postings lists are append-only
+arrays of doc number deltas. A snapshot file holds the compacted index;
+it is memory-mapped, so workers forked after loading it share the pages.
+Search returns post ids in any visibility state: callers hydrate them
+through Post.published.
+
+Every process keeps its own index. With a shared cache, committed edits
+are appended to a change log there and each process replays the entries
+it has not seen before searching; with a per process cache only the
+process that saved the post sees the edit until the next snapshot.
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from array import array
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+MAGIC = b'BLGIDX01'
+HEADER = struct.Struct('<8sI')
+TOKEN = re.compile(r'\w+')
+# Soft hyphen and zero-width characters pasted from word processors.
+INVISIBLE = dict.fromkeys(map(ord, '\u00ad\u200b\u200c\u200d\u2060\ufeff'))
+# Tried longest first; a stem keeps at least MIN_STEM letters.
+ENDINGS = frozenset((
+    'иями ями ами иях ях ах ией ий ый ой ей ем ом ам ям ия ию ии '
+    'ого его ому ему ыми ими ая яя ое ее ые ие ую юю ых их '
+    'ость ости остью ение ения ению ением ении ениям '
+    'ать ять ить еть уть ться тся ешь ет ют ут ем ишь ит ят им ите '
+    'ал ала али ало ил ила или ило ел ела ели '
+    'а я о е ы и у ю ь й'
+).split())
+ENDING_LENGTHS = sorted({len(ending) for ending in ENDINGS}, reverse=True)
+MIN_STEM = 3
+TITLE_WEIGHT = 2
+K1, B = 1.2, 0.75
+CHANGES_KEY = 'search:changes'  # number of the last logged change
+
+
+def normalize(text):
+    """Lowercase NFKC text with ё folded into е and invisibles dropped"""
+    text = unicodedata.normalize('NFKC', text).translate(INVISIBLE)
+    return text.lower().replace('ё', 'е')
+
+
+@lru_cache(maxsize=100000)
+def stem(token):
+    """Strip one inflectional ending from a Cyrillic word"""
+    if not ('а' <= token[0] <= 'я'):
+        return token
+    for length in ENDING_LENGTHS:
+        if (len(token) - length >= MIN_STEM
+                and token[-length:] in ENDINGS):
+            return token[:-length]
+    return token
+
+
+def tokenize(text):
+    return [stem(token) for token in TOKEN.findall(normalize(text))]
+
+
+def term_frequencies(title, text):
+    counts = {}
+    for token in tokenize(text):
+        counts[token] = counts.get(token, 0) + 1
+    for token in tokenize(title):
+        counts[token] = counts.get(token, 0) + TITLE_WEIGHT
+    return counts
+
+
+class Postings:
+    """Doc numbers of a term as deltas in an array, with frequencies
+
+    ``base`` arrays may be read-only views of a snapshot; documents added
+    later go to the in-memory tail.
+    """
+
+    __slots__ = ('base_deltas', 'base_tfs', 'deltas', 'tfs', 'last')
+
+    def __init__(self, base_deltas=(), base_tfs=(), last=-1):
+        self.base_deltas = base_deltas
+        self.base_tfs = base_tfs
+        self.deltas = array('I')
+        self.tfs = array('H')
+        self.last = last
+
+    def __len__(self):
+        return len(self.base_deltas) + len(self.deltas)
+
+    def add(self, doc, tf):
+        # Doc numbers only grow: appending keeps the list sorted.
+        self.deltas.append(doc - self.last if self.last >= 0 else doc)
+        self.tfs.append(min(tf, 0xFFFF))
+        self.last = doc
+
+    def __iter__(self):
+        doc = 0
+        for deltas, tfs in ((self.base_deltas, self.base_tfs),
+                            (self.deltas, self.tfs)):
+            for delta, tf in zip(deltas, tfs):
+                doc += delta
+                yield doc, tf
+
+
+class SearchIndex:
+    """BM25 inverted index of post titles and texts"""
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_pks = array('I')
+        self.doc_lengths = array('I')  # 0 once the document is retired
+        self.live = {}  # post id -> doc number
+        self.total_length = 0
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.snapshot_mtime = None
+        self.changes = None  # last change log entry applied
+
+    @classmethod
+    def build(cls, rows):
+        """Index (post id, title, text) rows"""
+        index = cls()
+        for pk, title, text in rows:
+            index.add(pk, title, text)
+        return index
+
+    def add(self, pk, title, text):
+        counts = term_frequencies(title, text)
+        with self.lock:
+            self._retire(pk)
+            doc = len(self.doc_pks)
+            length = sum(counts.values()) or 1
+            self.doc_pks.append(pk)
+            self.doc_lengths.append(length)
+            self.live[pk] = doc
+            self.total_length += length
+            for term, tf in counts.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = Postings()
+                postings.add(doc, tf)
+
+    def remove(self, pk):
+        with self.lock:
+            self._retire(pk)
+
+    def _retire(self, pk):
+        doc = self.live.pop(pk, None)
+        if doc is not None:
+            self.total_length -= self.doc_lengths[doc]
+            self.doc_lengths[doc] = 0
+
+    def __len__(self):
+        return len(self.live)
+
+    def search(self, text, limit=None, below=None):
+        """(score, post id) best first, only rows after ``below`` if given
+
+        Any of the terms matches, like a web search: posts having more of
+        them (or rarer ones) score higher.
+        """
+        terms = set(tokenize(text))
+        count = len(self.live)
+        if not terms or not count:
+            return []
+        average = self.total_length / count
+        scores = {}
+        with self.lock:
+            for term in terms:
+                postings = self.postings.get(term)
+                if postings is None:
+                    continue
+                # Retired documents still count: an upper bound on df.
+                df = min(len(postings), count)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                for doc, tf in postings:
+                    length = self.doc_lengths[doc]
+                    if length:
+                        norm = K1 * (1 - B + B * length / average)
+                        scores[doc] = scores.get(doc, 0.0) + (
+                            idf * tf * (K1 + 1) / (tf + norm))
+            rows = [(score, self.doc_pks[doc])
+                    for doc, score in scores.items()]
+        if below is not None:
+            rows = (row for row in rows if row < below)
+        if limit is None:
+            return sorted(rows, reverse=True)
+        return heapq.nlargest(limit, rows)
+
+    def write(self, path, changes=None):
+        """Compacted snapshot, atomically replacing ``path``
+
+        ``changes`` is the change log position the indexed rows include.
+        """
+        with self.lock:
+            live = sorted(self.live.items(), key=lambda item: item[1])
+            renumber = {doc: new for new, (_, doc) in enumerate(live)}
+            blocks, terms, offset = [], {}, 0
+            for term, postings in self.postings.items():
+                docs, tfs, previous = array('I'), array('H'), 0
+                for doc, tf in postings:
+                    if doc in renumber:
+                        docs.append(renumber[doc] - previous)
+                        tfs.append(tf)
+                        previous = renumber[doc]
+                if not docs:
+                    continue
+                # Small gaps fit in two bytes: half the size of 'I'.
+                if max(docs) <= 0xFFFF:
+                    docs = array('H', docs)
+                terms[term] = [offset, len(docs), docs.typecode, previous]
+                for block in (docs, tfs):
+                    blocks.append(block.tobytes())
+                    offset += len(blocks[-1])
+                    if offset % 4:
+                        blocks.append(b'\0' * (4 - offset % 4))
+                        offset += len(blocks[-1])
+            pks = array('I', (pk for pk, _ in live))
+            lengths = array('I', (self.doc_lengths[doc] for _, doc in live))
+        meta = json.dumps({
+            'docs': len(pks), 'total_length': sum(lengths), 'terms': terms,
+            'changes': changes,
+        }, ensure_ascii=False).encode()
+        meta += b' ' * (-(HEADER.size + len(meta)) % 4)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, len(meta)))
+            file.write(meta)
+            file.write(pks.tobytes())
+            file.write(lengths.tobytes())
+            file.writelines(blocks)
+        os.replace(tmp, path)
+        return len(pks)
+
+    @classmethod
+    def load(cls, path):
+        """Index over a read-only memory map of a snapshot"""
+        with open(path, 'rb') as file:
+            mtime = os.fstat(file.fileno()).st_mtime
+            snapshot = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_size = HEADER.unpack_from(snapshot)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a search index snapshot.')
+        meta = json.loads(bytes(
+            snapshot[HEADER.size:HEADER.size + meta_size]))
+        view = memoryview(snapshot)
+        start = HEADER.size + meta_size
+        docs = meta['docs']
+        index = cls()
+        index.snapshot, index.snapshot_mtime = snapshot, mtime
+        # Per-document arrays are copied (8 bytes a post): edits retire docs.
+        index.doc_pks = array('I', view[start:start + 4 * docs].cast('I'))
+        index.doc_lengths = array(
+            'I', view[start + 4 * docs:start + 8 * docs].cast('I'))
+        index.live = {pk: doc for doc, pk in enumerate(index.doc_pks)}
+        index.total_length = meta['total_length']
+        index.changes = meta.get('changes')
+        start += 8 * docs
+        for term, (offset, df, typecode, last) in meta['terms'].items():
+            deltas = start + offset
+            width = 2 if typecode == 'H' else 4
+            tfs = deltas + df * width
+            tfs += -tfs % 4 if width == 2 else 0
+            index.postings[term] = Postings(
+                view[deltas:deltas + df * width].cast(typecode),
+                view[tfs:tfs + df * 2].cast('H'),
+                last)
+        return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def snapshot_mtime():
+    try:
+        return os.stat(settings.SEARCH_INDEX_PATH).st_mtime
+    except OSError:
+        return None
+
+
+def logged_changes():
+    return cache.get(CHANGES_KEY)
+
+
+def build_from_database(chunk_size=2000):
+    from blog.models import Post
+    # Read first: changes logged while building are replayed, harmlessly.
+    changes = logged_changes()
+    index = SearchIndex.build(
+        Post.objects.values_list('pk', 'title', 'text').iterator(
+            chunk_size=chunk_size))
+    index.changes = changes
+    return index
+
+
+def replay_changes(index):
+    """Reindex the posts other processes changed since ``index.changes``"""
+    latest = logged_changes()
+    if latest is None or latest == index.changes:
+        return index
+    # No position: the log was empty when the rows were read.
+    applied = index.changes or 0
+    keys = [f'{CHANGES_KEY}:{number}'
+            for number in range(applied + 1, latest + 1)]
+    logged = cache.get_many(keys) if (
+        0 < len(keys) <= settings.SEARCH_CHANGES_REPLAY) else {}
+    if len(logged) < len(keys) or not keys:
+        # Too far behind, or the log was evicted: start over.
+        rebuilt = build_from_database()
+        rebuilt.snapshot_mtime = index.snapshot_mtime
+        return rebuilt
+    from blog.models import Post
+    pks = set(logged.values())
+    for pk, title, text in Post.objects.filter(pk__in=pks).values_list(
+            'pk', 'title', 'text'):
+        index.add(pk, title, text)
+        pks.discard(pk)
+    for pk in pks:
+        index.remove(pk)
+    index.changes = latest
+    return index
+
+
+def shared_index():
+    """This process' index: the snapshot if there is one, else built"""
+    global _index
+    with _index_lock:
+        mtime = snapshot_mtime()
+        if mtime is not None and (
+                _index is None or mtime != _index.snapshot_mtime):
+            _index = SearchIndex.load(settings.SEARCH_INDEX_PATH)
+        elif _index is None:
+            _index = build_from_database()
+        _index = replay_changes(_index)
+        return _index
+
+
+def loaded_index():
+    """Index of this process if it was built already, else None"""
+    return _index
+
+
+def reset():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def log_change(pk):
+    """Append a post to the change log replayed by every process"""
+    cache.add(CHANGES_KEY, 0, None)
+    number = cache.incr(CHANGES_KEY)
+    cache.set(f'{CHANGES_KEY}:{number}', pk, settings.SEARCH_CHANGES_TIMEOUT)
+
+
+def index_post(post):
+    """Reindex a saved post once its transaction commits"""
+    pk, title, text = post.pk, post.title, post.text
+    if settings.SHARED_CACHE:
+        transaction.on_commit(lambda: log_change(pk))
+        return
+    index = loaded_index()
+    if index is not None:
+        transaction.on_commit(lambda: index.add(pk, title, text))
+
+
+def unindex_post(pk):
+    if settings.SHARED_CACHE:
+        transaction.on_commit(lambda: log_change(pk))
+        return
+    index = loaded_index()
+    if index is not None:
+        transaction.on_commit(lambda: index.remove(pk))
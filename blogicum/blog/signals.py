@@ -0,0 +1,194 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete)
+from django.dispatch import receiver
+
+from blog.cache import (
+    bump_generations, forget_post_cards, forget_user, post_scope)
+from blog.images import release_post_image, schedule_post_image
+from blog.models import (
+    Category, Comment, Location, Post, is_deleting_post, mark_deleting_post)
+from blog.publication import post_published, refresh_next_publication
+from blog.search_engine import index_post, unindex_post
+from blog.trending import record_comment
+
+User = get_user_model()
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, **kwargs):
+    """Comments going with a deleted post are not uncounted one by one"""
+    mark_deleting_post(instance.pk)
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_post(sender, instance, **kwargs):
+    """Keep the initial post to notice a comment moved in admin"""
+    instance._initial_post_id = instance.post_id
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Count a new (or moved) comment on its post"""
+    previous_post_id = instance._initial_post_id
+    if not created and previous_post_id == instance.post_id:
+        return
+    if not created and previous_post_id is not None:
+        Post.objects.filter(
+            pk=previous_post_id, comment_count__gt=0
+        ).update(comment_count=F('comment_count') - 1)
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Uncount a deleted comment, but for those going with their post"""
+    if is_deleting_post(instance.post_id):
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_activity(sender, instance, created, **kwargs):
+    """Trending counters follow a new (or moved) comment"""
+    previous_post_id = instance._initial_post_id
+    if not created and previous_post_id == instance.post_id:
+        return
+    if not created and previous_post_id is not None:
+        record_comment(previous_post_id, instance.created_at, -1)
+    record_comment(instance.post_id, instance.created_at, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def forget_comment_activity(sender, instance, **kwargs):
+    """The counters of a deleted post cascade with it"""
+    if is_deleting_post(instance.post_id):
+        return
+    record_comment(instance.post_id, instance.created_at, -1)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    instance._initial_category_id = instance.category_id
+    instance._initial_image = instance.image.name
+
+
+@receiver(post_save, sender=Post)
+def process_post_image(sender, instance, created, raw=False, **kwargs):
+    """Renditions for a new image, the replaced one may be unused now"""
+    if raw:
+        return
+    previous = instance._initial_image
+    if instance.image and (created or instance.image.name != previous):
+        schedule_post_image(instance)
+    if previous and previous != instance.image.name:
+        release_post_image(previous)
+    instance._initial_image = instance.image.name
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, update_fields, **kwargs):
+    """Restem title and text: tsvector or the in-process index"""
+    if update_fields and not {'title', 'text'} & set(update_fields):
+        return
+    if connection.vendor == 'postgresql':
+        Post.objects.filter(pk=instance.pk).update_search_vector()
+    else:
+        index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    if connection.vendor != 'postgresql':
+        unindex_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_post_image(sender, instance, **kwargs):
+    if instance.image:
+        release_post_image(instance.image.name)
+
+
+def post_list_scopes(post, category_ids):
+    """Page cache scopes listing the post"""
+    slugs = Category.objects.filter(
+        pk__in=set(category_ids) - {None}).values_list('slug', flat=True)
+    username = User.objects.filter(
+        pk=post.author_id).values_list('username', flat=True).first()
+    return [
+        'index',
+        post_scope(post.pk),
+        f'profile:{username}',
+        *(f'category:{slug}' for slug in slugs),
+    ]
+
+
+@receiver((post_save, post_delete), sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    """A post moves every list it is (or was) on"""
+    forget_post_cards([instance.pk])
+    bump_generations(*post_list_scopes(
+        instance, [instance.category_id, instance._initial_category_id]))
+    instance._initial_category_id = instance.category_id
+    refresh_next_publication()
+
+
+@receiver(post_published, sender=Post)
+def invalidate_published_posts(sender, posts, **kwargs):
+    """Deferred posts went live: their lists gain them"""
+    scopes = set()
+    for post in posts:
+        scopes.update(post_list_scopes(post, [post.category_id]))
+    bump_generations(*scopes)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    """Only the pages showing the commented post are evicted"""
+    if is_deleting_post(instance.post_id):
+        return  # invalidate_post evicts them once for all its comments
+    post_ids = {instance.post_id, instance._initial_post_id} - {None}
+    forget_post_cards(post_ids)
+    bump_generations(*(post_scope(pk) for pk in post_ids))
+
+
+@receiver((post_save, pre_delete), sender=Category)
+@receiver((post_save, pre_delete), sender=Location)
+def invalidate_related_posts(sender, instance, **kwargs):
+    """Category and location title/visibility are shown on the cards"""
+    forget_post_cards(
+        instance.posts.values_list('pk', flat=True).iterator())
+    bump_generations('all')
+    if sender is Category:
+        refresh_next_publication()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_posts(sender, instance, created, update_fields,
+                            **kwargs):
+    """Author username is shown on the cards; logins only touch last_login"""
+    if created or (
+            update_fields is not None and set(update_fields) == {'last_login'}
+    ):
+        return
+    forget_post_cards(
+        Post.objects.filter(author=instance).values_list(
+            'pk', flat=True).iterator())
+    bump_generations('all')
+
+
+@receiver((post_save, post_delete), sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Profile edits, password changes and logins drop the cached user"""
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def reset_comment_post(sender, instance, **kwargs):
+    """Connected last: the receivers above compare with the initial post"""
+    instance._initial_post_id = instance.post_id
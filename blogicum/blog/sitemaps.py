@@ -0,0 +1,163 @@
+"""Sitemap files for crawlers, written to SITEMAP_ROOT and served by nginx
+
+Every section is split into shards by primary key range, so a shard keeps
+its URLs as the table grows: a new post changes the last shard only. A
+shard is rewritten only when the digest of its rows changed; an unchanged
+file keeps its mtime, so nginx answers conditional requests with a 304.
+"""
+import hashlib
+import json
+import os
+import re
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Min
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Category, Post
+
+INDEX = 'sitemap.xml'
+MANIFEST = 'manifest.json'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+# Usernames the profile URL (a slug) cannot hold have no page to list.
+SLUG = re.compile(r'[-a-zA-Z0-9_]+\Z')
+
+
+def sections():
+    """Section name -> (queryset, URL name, argument field, lastmod field)"""
+    return {
+        'posts': (Post.published.all(), 'blog:post_detail', 'pk', 'pub_date'),
+        'categories': (Category.objects.filter(is_published=True),
+                       'blog:category_posts', 'slug', None),
+        'profiles': (get_user_model().objects.filter(is_active=True),
+                     'blog:profile', 'username', None),
+    }
+
+
+def location_format(url_name, field):
+    """Absolute URL of ``url_name`` with {} in place of its argument"""
+    placeholder = 2 ** 31 - 1 if field == 'pk' else 'placeholder'
+    path = reverse(url_name, args=(placeholder,))
+    return settings.SITEMAP_BASE_URL.rstrip('/') + path.replace(
+        str(placeholder), '{}')
+
+
+def url_entries(rows, location):
+    for argument, *lastmod in rows:
+        if isinstance(argument, str) and not SLUG.match(argument):
+            continue
+        url = escape(location.format(quote(str(argument))))
+        if lastmod:
+            modified = lastmod[0].isoformat('T', 'seconds')
+            yield f'<url><loc>{url}</loc><lastmod>{modified}</lastmod></url>\n'
+        else:
+            yield f'<url><loc>{url}</loc></url>\n'
+
+
+def write_file(path, lines):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as file:
+        file.writelines(lines)
+    os.replace(tmp, path)
+
+
+def write_shard(path, entries, previous_digest=None):
+    """Stream ``entries`` into the shard at ``path``, digest and count
+
+    The file is replaced only if the digest differs from the previous
+    one; None if there were no entries.
+    """
+    tmp = f'{path}.{os.getpid()}.tmp'
+    digest, count = hashlib.sha1(), 0
+    try:
+        with open(tmp, 'w', encoding='utf-8') as file:
+            file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            file.write(f'<urlset xmlns="{XMLNS}">\n')
+            for entry in entries:
+                digest.update(entry.encode())
+                file.write(entry)
+                count += 1
+            file.write('</urlset>\n')
+        digest = digest.hexdigest()
+        if count and (digest != previous_digest
+                      or not os.path.exists(path)):
+            os.replace(tmp, path)
+            return digest, count, True
+        return (digest, count, False) if count else None
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def section_shards(name, queryset, url_name, field, lastmod, root, known,
+                   force=False):
+    """Write the changed shards of a section, {file name: manifest entry}"""
+    size, shards = settings.SITEMAP_SHARD_SIZE, {}
+    bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return shards
+    location = location_format(url_name, field)
+    fields = (field, lastmod) if lastmod else (field,)
+    for number in range(bounds['first'] // size, bounds['last'] // size + 1):
+        rows = queryset.filter(
+            pk__gte=number * size, pk__lt=(number + 1) * size
+        ).order_by('pk').values_list(*fields).iterator(
+            chunk_size=settings.SITEMAP_CHUNK_SIZE)
+        filename = f'sitemap-{name}-{number}.xml'
+        previous = known.get(filename)
+        written = write_shard(
+            os.path.join(root, filename), url_entries(rows, location),
+            None if force or not previous else previous['digest'])
+        if written is None:
+            continue
+        digest, urls, changed = written
+        if not changed:
+            shards[filename] = dict(previous, written=False)
+            continue
+        shards[filename] = {
+            'digest': digest, 'urls': urls, 'written': True,
+            'lastmod': timezone.now().isoformat('T', 'seconds'),
+        }
+    return shards
+
+
+def generate(root=None, force=False):
+    """Bring the sitemap files in ``root`` up to date
+
+    Returns (shards written, shards kept, shards removed).
+    """
+    root = str(root or settings.SITEMAP_ROOT)
+    os.makedirs(root, exist_ok=True)
+    try:
+        with open(os.path.join(root, MANIFEST), encoding='utf-8') as file:
+            known = json.load(file)
+    except (OSError, ValueError):
+        known = {}
+    shards = {}
+    for name, section in sections().items():
+        shards.update(section_shards(
+            name, *section, root=root, known=known, force=force))
+    written = [name for name, shard in shards.items() if shard.pop('written')]
+    removed = [name for name in known if name not in shards]
+    for name in removed:
+        try:
+            os.remove(os.path.join(root, name))
+        except FileNotFoundError:
+            pass
+    if written or removed or force or not os.path.exists(
+            os.path.join(root, INDEX)):
+        base = settings.SITEMAP_BASE_URL.rstrip('/')
+        write_file(os.path.join(root, INDEX), [
+            '<?xml version="1.0" encoding="UTF-8"?>\n',
+            f'<sitemapindex xmlns="{XMLNS}">\n',
+            *(f'<sitemap><loc>{escape(base)}/{name}</loc>'
+              f'<lastmod>{shard["lastmod"]}</lastmod></sitemap>\n'
+              for name, shard in shards.items()),
+            '</sitemapindex>\n',
+        ])
+        write_file(os.path.join(root, MANIFEST), [json.dumps(shards)])
+    return len(written), len(shards) - len(written), len(removed)
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import posixpath
+import re
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from blog.models import Post
+
+# <upload_to>/ab/cd/abcd...<64 hex>.<ext>, derived files next to it.
+BLOB_NAME = re.compile(
+    r'(?:^|/)(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?:renditions/)?'
+    r'(?P<digest>(?P=a)(?P=b)[0-9a-f]{60})[._]')
+
+
+def blob_digest(name):
+    """SHA-256 a content-addressed name belongs to, None for legacy names"""
+    match = BLOB_NAME.search(name or '')
+    return match and match.group('digest')
+
+
+def is_derived(name):
+    """Renditions of a source image, named after it"""
+    return posixpath.basename(posixpath.dirname(name)) == 'renditions'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Files named after the SHA-256 of their bytes, stored once
+
+    Saving content that is already there writes nothing and returns the
+    existing name, so the same photo posted many times is one file whose
+    URL never changes meaning and can be cached forever. Derived files
+    (image renditions, in a renditions/ directory next to their source,
+    legacy sources included) are stored as given.
+    Blobs are removed by release() once no post references them.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if blob_digest(name) or is_derived(name):
+            if self.exists(name):
+                self.delete(name)
+            return super().save(name, content, max_length)
+        name = self.blob_name(name, self.digest(content))
+        if self.exists(name):
+            # Fresh mtime: a concurrent release() must not take it away.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        if blob_digest(name) or is_derived(name):
+            # Lost a race with an identical upload: same bytes, same file.
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            return name
+
+    def digest(self, content):
+        upload = getattr(content, 'image_upload', None)
+        if upload is not None:
+            # Already hashed while the upload streamed in.
+            return upload.sha256
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+    def blob_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension)
+
+    def derived_names(self, name):
+        """Renditions stored next to the blob"""
+        directory = posixpath.join(posixpath.dirname(name), 'renditions')
+        prefix = posixpath.splitext(posixpath.basename(name))[0]
+        try:
+            files = self.listdir(directory)[1]
+        except FileNotFoundError:
+            return []
+        return [
+            posixpath.join(directory, filename)
+            for filename in files if filename.startswith(prefix)
+        ]
+
+    def is_stale(self, name, grace):
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) > grace
+        except FileNotFoundError:
+            return False
+
+    def release(self, name, grace=None):
+        """Drop a blob and its renditions unless a post still uses them"""
+        stem = posixpath.splitext(name)[0]
+        if blob_digest(name) != posixpath.basename(stem):
+            return False  # legacy or derived name
+        if grace is None:
+            grace = settings.MEDIA_BLOB_GRACE
+        # Same bytes may be referenced under another extension.
+        references = set(Post.objects.filter(
+            image__startswith=stem).values_list('image', flat=True))
+        if name in references or not self.is_stale(name, grace):
+            # A fresh mtime: saved again by a transaction still running.
+            return False
+        if not references:
+            for derived in self.derived_names(name):
+                self.delete(derived)
+        self.delete(name)
+        return True
@@ -0,0 +1,18 @@
+from django import template
+
+from blog.cache import render_post_cards
+from blog.images import picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Rendered cards for a page of posts, served from the fragment cache"""
+    return render_post_cards(posts)
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, sizes='100vw', fallback='card'):
+    """Responsive <picture> of the post image, the original until processed"""
+    return {'post': post, 'picture': picture(post, fallback), 'sizes': sizes}
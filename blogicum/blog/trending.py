@@ -0,0 +1,119 @@
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blog.models import CommentActivity, Post
+from blog.publication import ttl_ceiling
+
+BUCKETS_KEY = 'trending:buckets'
+RANKING_KEY = 'trending:ranking'
+
+
+def bucket_of(moment):
+    """Start of the TRENDING_BUCKET interval holding ``moment``"""
+    size = settings.TRENDING_BUCKET
+    return datetime.fromtimestamp(
+        int(moment.timestamp()) // size * size, dt_timezone.utc)
+
+
+def window_start(now=None):
+    """First bucket still inside the last TRENDING_HOURS"""
+    current = bucket_of(now or timezone.now())
+    return current - timedelta(
+        seconds=settings.TRENDING_HOURS * 60 * 60 - settings.TRENDING_BUCKET)
+
+
+def record_comment(post_id, created_at, delta):
+    """Add ``delta`` comments to the bucket of ``created_at``"""
+    bucket = bucket_of(created_at)
+    if bucket < window_start():
+        return  # out of the window: nothing reads it any more
+    activity = CommentActivity.objects.filter(post_id=post_id, bucket=bucket)
+    if not activity.update(count=F('count') + delta) and delta > 0:
+        try:
+            with transaction.atomic():
+                CommentActivity.objects.create(
+                    post_id=post_id, bucket=bucket, count=delta)
+        except IntegrityError:
+            # Created by a concurrent comment meanwhile.
+            activity.update(count=F('count') + delta)
+    if bucket < bucket_of(timezone.now()):
+        # Closed buckets are cached: an old comment deleted changes one.
+        cache.delete(BUCKETS_KEY)
+
+
+def load_buckets(since, until=None):
+    """{bucket timestamp: {post id: comments}} of [since, until)"""
+    rows = CommentActivity.objects.filter(bucket__gte=since, count__gt=0)
+    if until is not None:
+        rows = rows.filter(bucket__lt=until)
+    buckets = {}
+    for bucket, post_id, count in rows.values_list(
+            'bucket', 'post_id', 'count').iterator():
+        buckets.setdefault(bucket.timestamp(), {})[post_id] = count
+    return buckets
+
+
+def trending_scores(now=None):
+    """Comments per post over the window
+
+    Closed buckets never change (but for deletions, which drop the cached
+    state), so they are read once and kept in the cache; every refresh
+    reads only the buckets closed since and the open one.
+    """
+    now = now or timezone.now()
+    start, current = window_start(now), bucket_of(now)
+    state = cache.get(BUCKETS_KEY)
+    if state is None or state['until'] <= start.timestamp():
+        closed = load_buckets(start, current)
+    else:
+        closed = {
+            bucket: counts for bucket, counts in state['buckets'].items()
+            if bucket >= start.timestamp()
+        }
+        if state['until'] < current.timestamp():
+            closed.update(load_buckets(
+                datetime.fromtimestamp(state['until'], dt_timezone.utc),
+                current))
+    cache.set(BUCKETS_KEY, {
+        'until': current.timestamp(),
+        'buckets': closed,
+    }, settings.TRENDING_HOURS * 60 * 60)
+    scores = Counter()
+    for counts in closed.values():
+        scores.update(counts)
+    for counts in load_buckets(current).values():
+        scores.update(counts)
+    return scores
+
+
+def trending_ranking():
+    """[(post id, comments)] of the most discussed published posts"""
+    ranking = cache.get(RANKING_KEY)
+    if ranking is not None:
+        return ranking
+    size = settings.TRENDING_SIZE
+    # Extra candidates make up for posts hidden since they were commented.
+    candidates = heapq.nlargest(
+        size * 2, trending_scores().items(),
+        key=lambda item: (item[1], item[0]))
+    visible = set(Post.published.filter(
+        pk__in=[pk for pk, _ in candidates]).values_list('pk', flat=True))
+    ranking = [
+        (pk, score) for pk, score in candidates if pk in visible][:size]
+    cache.set(RANKING_KEY, ranking, ttl_ceiling(settings.TRENDING_REFRESH))
+    return ranking
+
+
+def compact(now=None):
+    """Drop buckets that left the window and emptied ones"""
+    deleted, _ = CommentActivity.objects.filter(
+        bucket__lt=window_start(now)).delete()
+    emptied, _ = CommentActivity.objects.filter(count__lte=0).delete()
+    return deleted + emptied
@@ -0,0 +1,87 @@
+import hashlib
+import warnings
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image
+
+# Only the header is sniffed: Pillow identifies the format and size from it.
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+HEADER_LIMIT = 256 * 1024
+
+ImageUpload = namedtuple(
+    'ImageUpload', 'format width height size sha256 error')
+
+
+class BoundedImageUploadHandler(FileUploadHandler):
+    """Check image uploads chunk by chunk before the next handler stores them
+
+    Sits first in FILE_UPLOAD_HANDLERS and passes chunks through unchanged.
+    A file over IMAGE_MAX_BYTES or IMAGE_MAX_PIXELS, or whose header is not
+    an allowed image format, is skipped as soon as that is known; the
+    reason (or the format, size and sha256 of a good file) ends up in
+    request.image_uploads for the form.
+    """
+
+    def handle_raw_input(self, *args, **kwargs):
+        self.request.image_uploads = {}
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.header = b''
+        self.image = None
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.IMAGE_MAX_BYTES:
+            self.reject(
+                'Файл больше '
+                f'{settings.IMAGE_MAX_BYTES // (1024 * 1024)} МБ.')
+        if self.image is None:
+            self.sniff(raw_data)
+        self.sha256.update(raw_data)
+        return raw_data
+
+    def sniff(self, raw_data):
+        self.header += raw_data
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', Image.DecompressionBombWarning)
+                self.image = Image.open(
+                    BytesIO(self.header), formats=IMAGE_FORMATS)
+        except (Image.DecompressionBombWarning,
+                Image.DecompressionBombError):
+            self.reject('Изображение слишком большое.')
+        except (OSError, SyntaxError, ValueError):
+            if len(self.header) >= HEADER_LIMIT:
+                self.reject('Загрузите правильное изображение.')
+            return
+        self.header = b''
+        width, height = self.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.reject(
+                f'Изображение {width}×{height} больше '
+                f'{settings.IMAGE_MAX_PIXELS} пикселей.')
+
+    def file_complete(self, file_size):
+        if self.image is None:
+            # Too late to skip: the form drops the file on this error.
+            self.record('Загрузите правильное изображение.')
+            return None
+        self.request.image_uploads[self.field_name] = ImageUpload(
+            self.image.format, *self.image.size, file_size,
+            self.sha256.hexdigest(), None)
+        # The next handler returns the stored file.
+        return None
+
+    def record(self, error):
+        self.request.image_uploads[self.field_name] = ImageUpload(
+            None, None, None, self.size, None, error)
+
+    def reject(self, error):
+        self.record(error)
+        raise SkipFile(error)
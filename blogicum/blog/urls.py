@@ -1,18 +1,54 @@
+from django.conf import settings
 from django.urls import path
 
-from blog import views
+from blog import async_views, feeds, views
 
 app_name = 'blog'
 
+if settings.ASYNC_VIEWS:
+    post_list = async_views.post_list
+    post_detail = async_views.post_detail
+    profile_detail = async_views.profile_detail
+    category_post_list = async_views.category_post_list
+else:
+    post_list = views.PostListView.as_view()
+    post_detail = views.PostDetailView.as_view()
+    profile_detail = views.ProfileDetailView.as_view()
+    category_post_list = views.CategoryPostListView.as_view()
+
 urlpatterns = [
-    path('', views.PostListView.as_view(), name='index'),
+    path('', post_list, name='index'),
     path(
         'posts/create/',
         views.PostCreateView.as_view(),
         name='create_post'
      ),
+    path('feeds/rss/',
+         feeds.PostFeed(),
+         name='feed_rss'),
+    path('feeds/atom/',
+         feeds.AtomPostFeed(),
+         name='feed_atom'),
+    path('category/<slug:category_slug>/rss/',
+         feeds.CategoryPostFeed(),
+         name='category_feed_rss'),
+    path('category/<slug:category_slug>/atom/',
+         feeds.AtomCategoryPostFeed(),
+         name='category_feed_atom'),
+    path('profile/<slug:username>/rss/',
+         feeds.AuthorPostFeed(),
+         name='profile_feed_rss'),
+    path('profile/<slug:username>/atom/',
+         feeds.AtomAuthorPostFeed(),
+         name='profile_feed_atom'),
+    path('trending/',
+         views.TrendingPostListView.as_view(),
+         name='trending'),
+    path('search/',
+         views.PostSearchView.as_view(),
+         name='search'),
     path('posts/<int:pk>/',
-         views.PostDetailView.as_view(),
+         post_detail,
          name='post_detail'),
     path('posts/<int:pk>/edit/',
          views.PostUpdateView.as_view(),
@@ -20,6 +56,9 @@ urlpatterns = [
     path('posts/<int:pk>/delete/',
          views.PostDeleteView.as_view(),
          name='delete_post'),
+    path('posts/<int:pk>/comments/',
+         views.CommentListView.as_view(),
+         name='comments'),
     path('posts/<int:pk>/add_comment/',
          views.CommentCreateView.as_view(),
          name='add_comment'),
@@ -33,9 +72,9 @@ urlpatterns = [
          views.ProfileUpdateView.as_view(),
          name='edit_profile'),
     path('profile/<slug:username>/',
-         views.ProfileDetailView.as_view(),
+         profile_detail,
          name='profile'),
     path('category/<slug:category_slug>/',
-         views.CategoryPostListView.as_view(),
+         category_post_list,
          name='category_posts'),
 ]
@@ -1,21 +1,49 @@
+import copy
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from http import HTTPStatus
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count
+from django.db.models import Count, Max
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, quote_etag)
+from django.utils.http import http_date, parse_http_date
 from django.views.generic import (
     CreateView, DeleteView, DetailView, ListView,
     UpdateView)
 
 from blogicum.settings import PAGE_COUNT
 
+from blog.cache import (
+    cache_page, current_generations, get_cached_page, page_cache_key,
+    post_scope, render_post_cards)
 from blog.forms import CommentForm, PostForm, ProfileForm
 from blog.models import Category, Comment, Post
+from blog.paginators import CursorPage, CursorPaginator
+from blog.search import search_posts
+from blog.trending import trending_ranking
 
 User = get_user_model()
 
 
-class OnlyUserMixin(UserPassesTestMixin):
+class MemoizedObjectMixin:
+    """Resolve the view object at most once per request"""
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if '_memoized_object' not in self.__dict__:
+            self._memoized_object = super().get_object()
+        return self._memoized_object
+
+
+class OnlyUserMixin(MemoizedObjectMixin, UserPassesTestMixin):
     """Current user checking (to update profile e.g.)"""
 
     def test_func(self):
@@ -24,7 +52,7 @@ class OnlyUserMixin(UserPassesTestMixin):
         return object == self.request.user
 
 
-class OnlyAuthorMixin(UserPassesTestMixin):
+class OnlyAuthorMixin(MemoizedObjectMixin, UserPassesTestMixin):
     """Authorship checking"""
 
     def handle_no_permission(self):
@@ -33,24 +61,176 @@ class OnlyAuthorMixin(UserPassesTestMixin):
     def test_func(self):
         """Check the author of object is the current user"""
         object = self.get_object()
-        return object.author == self.request.user
-
+        return object.author_id == self.request.user.pk
+
+
+class CursorPaginationMixin:
+    """Keyset pagination by (pub_date, id) with ?after=/?before= cursors"""
+
+    cursor_ordering = ('-pub_date', '-id')
+
+    def cursor_mode(self):
+        """Enabled by settings or by a cursor in the query string"""
+        return (settings.CURSOR_PAGINATION
+                or 'after' in self.request.GET
+                or 'before' in self.request.GET)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_mode():
+            return super().paginate_queryset(queryset, page_size)
+        page = CursorPaginator(
+            queryset, page_size, self.cursor_ordering
+        ).page(after=self.request.GET.get('after'),
+               before=self.request.GET.get('before'))
+        return None, page, page.object_list, page.has_other_pages()
+
+
+class ConditionalGetMixin:
+    """ETag and Last-Modified worked out before the page is rendered
+
+    Validators come from the cache generations of the page scopes, bumped
+    by every edit and deletion, plus (for lists) one aggregate over the
+    posts the page shows: latest pub_date, latest comment, comment count.
+    A matching If-None-Match or If-Modified-Since gets a 304 right away.
+    A page the validators cannot describe (None values) goes without them.
+    """
+
+    def validator_scopes(self):
+        return ('all',)
+
+    def validator_queryset(self):
+        """Primary keys of the posts the response is built from"""
+        return self.get_queryset().values('pk')
+
+    def validator_values(self):
+        queryset = self.validator_queryset()
+        if queryset is None:
+            return None
+        return Post.objects.filter(pk__in=queryset).aggregate(
+            published=Max('pub_date'),
+            commented=Max('comments__created_at'),
+            comments=Count('comments'),
+        )
 
-class PostListView(ListView):
+    def validators(self):
+        values = self.validator_values()
+        if values is None:
+            return None, None
+        generations = current_generations(self.validator_scopes())
+        # The path and query tell apart pages built from the same posts.
+        etag = hashlib.md5(repr((
+            self.request.user.pk,
+            self.request.get_full_path(),
+            sorted(generations.items()),
+            sorted(values.items()),
+        )).encode()).hexdigest()
+        moments = [
+            datetime.fromtimestamp(generation / 1e9, dt_timezone.utc)
+            for generation in generations.values() if generation
+        ] + [value for value in (values.get('published'),
+                                 values.get('commented')) if value]
+        # A deferred post on its author's profile must not date the page.
+        last_modified = min(max(moments, default=timezone.now()),
+                            timezone.now())
+        return quote_etag(etag), int(last_modified.timestamp())
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.validators()
+        response = None
+        if etag is not None:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if etag is not None and response.status_code in (
+                HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Revalidate every time instead of heuristic freshness.
+            patch_cache_control(
+                response, no_cache=True,
+                private=request.user.is_authenticated)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """Validators of the posts on the requested page"""
+
+    def validator_scopes(self):
+        return self.page_cache_scopes()
+
+    def validator_queryset(self):
+        object_list = self.get_queryset()
+        # ListView.get() reuses it: no second category or profile lookup.
+        self.get_queryset = lambda: object_list
+        queryset = object_list.values('pk')
+        if self.cursor_mode():
+            try:
+                return CursorPaginator(
+                    queryset, self.paginate_by, self.cursor_ordering
+                ).window(after=self.request.GET.get('after'),
+                         before=self.request.GET.get('before'))
+            except Http404:
+                return None
+        try:
+            number = int(self.request.GET.get(self.page_kwarg) or 1)
+        except ValueError:
+            # 'last' or garbage: the posts shown are not known here.
+            return None
+        start = (max(number, 1) - 1) * self.paginate_by
+        return queryset[start:start + self.paginate_by]
+
+
+class AnonymousPageCacheMixin:
+    """Whole-response cache of a post list for logged-out readers"""
+
+    def page_cache_scopes(self):
+        """Generations that invalidate the page besides its own posts"""
+        return ('all',)
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+        key = page_cache_key(request)
+        scopes = self.page_cache_scopes()
+        response, generations = get_cached_page(key, scopes)
+        if response is not None and response.has_header('ETag'):
+            return get_conditional_response(
+                request, etag=response['ETag'],
+                last_modified=parse_http_date(response['Last-Modified']),
+                response=response)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == HTTPStatus.OK:
+                response.render()
+                post_ids = [
+                    post.pk for post in response.context_data['page_obj']]
+                cache_page(key, generations, scopes, post_ids, response)
+        return response
+
+
+class PostListView(AnonymousPageCacheMixin, ConditionalListMixin,
+                   CursorPaginationMixin, ListView):
     paginate_by = PAGE_COUNT
     template_name = 'blog/index.html'
 
+    def page_cache_scopes(self):
+        return ('all', 'index')
+
     def get_queryset(self):
         return Post.published.select_related(
             'category', 'location', 'author'
-        ).annotate(comment_count=Count('comments')).order_by(
-            '-pub_date')
+        ).order_by('-pub_date')
 
 
-class CategoryPostListView(ListView):
+class CategoryPostListView(AnonymousPageCacheMixin, ConditionalListMixin,
+                           CursorPaginationMixin, ListView):
     paginate_by = PAGE_COUNT
     template_name = 'blog/category.html'
 
+    def page_cache_scopes(self):
+        return ('all', f"category:{self.kwargs.get('category_slug')}")
+
     def get_queryset(self):
         self.category = get_object_or_404(Category.objects.filter(
             is_published=True,
@@ -58,8 +238,7 @@ class CategoryPostListView(ListView):
         )
         page_obj = self.category.posts(manager='published').select_related(
             'category', 'location', 'author'
-        ).annotate(comment_count=Count('comments')).order_by(
-            '-pub_date')
+        ).order_by('-pub_date')
         return page_obj
 
     def get_context_data(self, **kwargs):
@@ -68,7 +247,67 @@ class CategoryPostListView(ListView):
         return context
 
 
-class PostCreateView(LoginRequiredMixin, CreateView):
+class TrendingPostListView(ListView):
+    """Most discussed published posts of the last TRENDING_HOURS"""
+
+    template_name = 'blog/trending.html'
+
+    def get_queryset(self):
+        ranking = trending_ranking()
+        posts = Post.published.select_related(
+            'category', 'location', 'author'
+        ).in_bulk([pk for pk, _ in ranking])
+        object_list = []
+        for pk, comments in ranking:
+            post = posts.get(pk)
+            if post is not None:
+                post.recent_comments = comments
+                object_list.append(post)
+        return object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['trending'] = zip(
+            render_post_cards(self.object_list),
+            [post.recent_comments for post in self.object_list])
+        context['hours'] = settings.TRENDING_HOURS
+        return context
+
+
+class PostSearchView(ListView):
+    """Full-text search over published posts, best matches first"""
+
+    template_name = 'blog/search.html'
+    query_max_length = 200
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()[
+            :self.query_max_length]
+        if not self.query:
+            self.page = CursorPage([])
+        else:
+            self.page = search_posts(
+                self.query, PAGE_COUNT, after=self.request.GET.get('after'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['page_obj'] = self.page
+        return context
+
+
+class ImageUploadFormMixin:
+    """Hand the checks done while the upload streamed in to the form"""
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['image_uploads'] = getattr(
+            self.request, 'image_uploads', None)
+        return kwargs
+
+
+class PostCreateView(LoginRequiredMixin, ImageUploadFormMixin, CreateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -84,7 +323,7 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         )
 
 
-class PostUpdateView(OnlyAuthorMixin, UpdateView):
+class PostUpdateView(OnlyAuthorMixin, ImageUploadFormMixin, UpdateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -103,8 +342,7 @@ class PostDeleteView(OnlyAuthorMixin, DeleteView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        instance = get_object_or_404(Post, pk=self.kwargs.get('pk'))
-        context['form'] = PostForm(instance=instance)
+        context['form'] = PostForm(instance=self.object)
         return context
 
     def get_success_url(self):
@@ -114,52 +352,68 @@ class PostDeleteView(OnlyAuthorMixin, DeleteView):
         )
 
 
-class PostDetailView(LoginRequiredMixin, DetailView):
+class PostDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     model = Post
     paginate_by = PAGE_COUNT
     template_name = 'blog/detail.html'
 
+    def validator_scopes(self):
+        return ('all', post_scope(self.kwargs.get('pk')))
+
+    def validator_values(self):
+        # Edits, comments and deletions all bump the post generation.
+        return {}
+
     def get_object(self):
-        post_object = get_object_or_404(Post, pk=self.kwargs.get('pk'))
-        if post_object.author == self.request.user:
-            return post_object
-        return get_object_or_404(Post.published, pk=self.kwargs.get('pk'))
+        """Post with its relations, visible to the author or if published"""
+        return get_object_or_404(
+            Post.objects.select_related(
+                'category', 'location', 'author'
+            ).visible_to(self.request.user),
+            pk=self.kwargs.get('pk'))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = (
-            self.object.comments.select_related('author')
-        )
+        context['comments'] = CursorPaginator(
+            self.object.comments.select_related('author'),
+            self.paginate_by,
+            ordering=('created_at', 'id'),
+        ).page(after=self.request.GET.get('after'))
         return context
 
 
+class CommentListView(PostDetailView):
+    """Next batch of a post comments as an HTML fragment"""
+
+    template_name = 'includes/comment_list.html'
+
+
 class CommentCreateView(LoginRequiredMixin, CreateView):
     model = Comment
     form_class = CommentForm
 
     def dispatch(self, request, *args, **kwargs):
-        self.post_obj = get_object_or_404(Post, pk=kwargs.get('pk'))
+        if not Post.objects.filter(pk=kwargs.get('pk')).exists():
+            raise Http404('Публикация не найдена.')
         return super().dispatch(request, *args, **kwargs)
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        form.instance.post_id = self.post_obj.pk
+        form.instance.post_id = self.kwargs.get('pk')
         return super().form_valid(form)
 
     def get_success_url(self):
         return reverse_lazy(
             'blog:post_detail',
-            kwargs={'pk': self.post_obj.pk})
+            kwargs={'pk': self.kwargs.get('pk')})
 
 
 class CommentUpdateView(OnlyAuthorMixin, UpdateView):
     model = Comment
     form_class = CommentForm
     template_name = 'blog/comment.html'
-
-    def get_object(self):
-        return get_object_or_404(Comment, pk=self.kwargs.get('comment_id'))
+    pk_url_kwarg = 'comment_id'
 
     def get_success_url(self):
         return reverse_lazy(
@@ -171,9 +425,7 @@ class CommentDeleteView(OnlyAuthorMixin, DeleteView):
     model = Comment
     form_class = CommentForm
     template_name = 'blog/comment.html'
-
-    def get_object(self):
-        return get_object_or_404(Comment, pk=self.kwargs.get('comment_id'))
+    pk_url_kwarg = 'comment_id'
 
     def get_success_url(self):
         return reverse_lazy(
@@ -181,21 +433,23 @@ class CommentDeleteView(OnlyAuthorMixin, DeleteView):
             kwargs={'pk': self.kwargs.get('pk')})
 
 
-class ProfileDetailView(ListView):
+class ProfileDetailView(AnonymousPageCacheMixin, ConditionalListMixin,
+                        CursorPaginationMixin, ListView):
     template_name = 'blog/profile.html'
     paginate_by = PAGE_COUNT
 
+    def page_cache_scopes(self):
+        return ('all', f"profile:{self.kwargs.get('username')}")
+
     def get_queryset(self):
         self.profile = get_object_or_404(
             User,
             username=self.kwargs.get('username'))
         if self.request.user == self.profile:
             return self.profile.posts.select_related(
-                'category', 'location').annotate(
-                    comment_count=Count('comments')).order_by('-pub_date')
+                'category', 'location').order_by('-pub_date')
         return self.profile.posts(manager='published').select_related(
-            'category', 'location').annotate(
-                comment_count=Count('comments')).order_by('-pub_date')
+            'category', 'location').order_by('-pub_date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -210,7 +464,14 @@ class ProfileUpdateView(OnlyUserMixin, UpdateView):
     template_name = 'blog/user.html'
 
     def get_object(self):
-        return get_object_or_404(User, id=self.request.user.id)
+        """Copy of the user loaded by AuthenticationMiddleware.
+
+        A copy keeps request.user (shown in the header) intact when the
+        form is invalid.
+        """
+        if not self.request.user.is_authenticated:
+            raise Http404('Пользователь не найден.')
+        return copy.copy(self.request.user)
 
     def get_success_url(self):
         return reverse(
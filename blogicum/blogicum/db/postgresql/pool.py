@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+
+logger = logging.getLogger('blogicum.db.pool')
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout"""
+
+
+class ConnectionPool:
+    """Process-wide bounded pool of raw psycopg2 connections
+
+    Threads (gthread, ASGI pool threads) share max_size connections instead
+    of keeping one each. A connection idle for more than check_after
+    seconds is pinged before it is handed out again.
+    """
+
+    def __init__(self, max_size, timeout, check_after):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.pid = os.getpid()
+        self.idle = deque()
+        self.size = 0
+        self.condition = threading.Condition()
+        self.metrics = dict.fromkeys((
+            'checkouts', 'waits', 'wait_ms', 'timeouts', 'opened',
+            'discarded'), 0)
+
+    def stats(self):
+        with self.condition:
+            return {
+                **self.metrics,
+                'wait_ms': round(self.metrics['wait_ms'], 1),
+                'size': self.size,
+                'idle': len(self.idle),
+                'max_size': self.max_size,
+            }
+
+    def acquire(self, connect):
+        """An idle connection, or a new one from connect() if under max_size"""
+        started = time.monotonic()
+        waited = False
+        with self.condition:
+            self.metrics['checkouts'] += 1
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    if not waited:
+                        waited = True
+                        self.metrics['waits'] += 1
+                    remaining = started + self.timeout - time.monotonic()
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        self.metrics['timeouts'] += 1
+                        self.metrics['wait_ms'] += (
+                            time.monotonic() - started) * 1000
+                        raise PoolTimeout(
+                            f'No database connection free in '
+                            f'{self.timeout}s ({self.max_size} in use).')
+                if self.idle:
+                    connection, released_at = self.idle.pop()
+                else:
+                    self.size += 1
+                    connection = None
+            if connection is None:
+                connection = self.open(connect)
+                break
+            # Pinged outside the lock: other threads keep going meanwhile.
+            if self.healthy(connection, released_at):
+                break
+            with self.condition:
+                self.discard(connection)
+        if waited:
+            with self.condition:
+                self.metrics['wait_ms'] += (
+                    time.monotonic() - started) * 1000
+        return connection
+
+    def open(self, connect):
+        # Outside the lock: connecting takes a few network round trips.
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.metrics['opened'] += 1
+        return connection
+
+    def release(self, connection):
+        """Take a connection back, rolled back; broken ones are dropped"""
+        usable = not connection.closed
+        if usable and (connection.get_transaction_status()
+                       != extensions.TRANSACTION_STATUS_IDLE):
+            try:
+                connection.rollback()
+            except Exception:
+                usable = False
+        with self.condition:
+            if usable:
+                self.idle.append((connection, time.monotonic()))
+                self.condition.notify()
+            else:
+                self.discard(connection)
+
+    def healthy(self, connection, released_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - released_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            logger.info('Dropping a dead pooled connection', exc_info=True)
+            return False
+
+    def discard(self, connection):
+        """Forget a connection; the caller holds the lock"""
+        self.size -= 1
+        self.metrics['discarded'] += 1
+        self.condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                connection, _ = self.idle.pop()
+                self.size -= 1
+                connection.close()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,14 +84,29 @@ WSGI_APPLICATION = 'blogicum.wsgi.application'
 # else:
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.postgresql plus health checks and pooling
+        'ENGINE': 'blogicum.db.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Seconds a connection is kept between requests, 0 closes it
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'HEALTH_CHECKS': True,
+        },
     }
 }
+# Threaded or ASGI workers: share DB_POOL_SIZE connections per process
+if int(os.getenv('DB_POOL_SIZE', 0)):
+    DATABASES['default']['OPTIONS']['POOL'] = {
+        'MAX_SIZE': int(os.getenv('DB_POOL_SIZE')),
+        'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER', 30)),
+    }
+    # Every request hands its connection back to the pool.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -151,3 +167,132 @@ CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 LOGIN_REDIRECT_URL = 'blog:index'
 LOGIN_URL = 'login'
 PAGE_COUNT = 10
+# Keyset pagination (?after=/?before=) for the post lists instead of ?page=N
+CURSOR_PAGINATION = bool(int(os.getenv('CURSOR_PAGINATION', 0)))
+
+# Cache backend: locmem (default, tests), file or memcached in production
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Rendered post cards, invalidated by blog.signals on any related change
+POST_CARD_CACHE_TIMEOUT = int(os.getenv('POST_CARD_CACHE_TIMEOUT', 60 * 60 * 24))
+# Whole-page cache of the post lists for anonymous readers
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 60 * 10))
+
+# Max SQL queries per request by view name (cold caches, form posts too);
+# exceeding one is logged, and raises QueryBudgetExceeded when strict.
+QUERY_BUDGETS = {
+    'blog:index': 7,
+    'blog:category_posts': 7,
+    'blog:profile': 7,
+    'blog:post_detail': 4,
+    'blog:comments': 4,
+    'blog:search': 4,
+    'blog:trending': 7,
+    'blog:create_post': 11,
+    'blog:edit_post': 12,
+    'blog:delete_post': 12,
+    'blog:add_comment': 8,
+    'blog:edit_comment': 4,
+    'blog:delete_comment': 7,
+    'blog:edit_profile': 5,
+}
+QUERY_BUDGET_STRICT = bool(int(os.getenv('QUERY_BUDGET_STRICT', 0)))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
+# Threads building post image renditions; 0 builds them right after commit
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+# Image uploads are checked while they stream in, see blog.uploadhandlers
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploadhandlers.BoundedImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
+
+# Post images are stored once per content, see blog.storage
+DEFAULT_FILE_STORAGE = 'blog.storage.ContentAddressedStorage'
+# Unreferenced blobs younger than this are kept: an upload of the same
+# bytes may be about to reference them.
+MEDIA_BLOB_GRACE = int(os.getenv('MEDIA_BLOB_GRACE', 60 * 60))
+
+# ASGI deployment: async list/detail views on a pool of this many threads
+# per worker process (also the DB connections they hold)
+ASYNC_VIEWS = bool(int(os.getenv('ASYNC_VIEWS', 0)))
+ASYNC_VIEW_THREADS = int(os.getenv('ASYNC_VIEW_THREADS', 8))
+
+# Sessions: cached_db once the cache is shared by all workers (locmem is
+# per process, a logout would not reach the others), signed_cookies for
+# no server side storage at all
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SHARED_CACHE = os.getenv('CACHE_BACKEND', 'locmem') != 'locmem'
+SESSION_ENGINE = SESSION_ENGINES[os.getenv(
+    'SESSION_BACKEND', 'cached_db' if SHARED_CACHE else 'db')]
+# request.user from the cache, dropped by blog.signals on every user save;
+# off with a per process cache, a password change must reach every worker
+AUTHENTICATION_BACKENDS = [
+    'blog.backends.CachedModelBackend',
+    # Sessions started before it was added name this one: keep them valid.
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = int(os.getenv(
+    'USER_CACHE_TIMEOUT', 60 * 15 if SHARED_CACHE else 0))
+
+# PostgreSQL text search configuration of posts (LANGUAGE_CODE is ru-RU)
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+# Snapshot of the in-process search index used without PostgreSQL
+SEARCH_INDEX_PATH = os.getenv(
+    'SEARCH_INDEX_PATH', str(BASE_DIR / 'search_index.bin'))
+# Edits logged in the shared cache for the other processes' indexes; one
+# further behind (or whose log expired) rebuilds its index from the table
+SEARCH_CHANGES_TIMEOUT = int(os.getenv('SEARCH_CHANGES_TIMEOUT', 60 * 60))
+SEARCH_CHANGES_REPLAY = int(os.getenv('SEARCH_CHANGES_REPLAY', 5000))
+
+# Trending feed: comments per TRENDING_BUCKET seconds summed over the last
+# TRENDING_HOURS; the top TRENDING_SIZE posts are re-ranked at most every
+# TRENDING_REFRESH seconds
+TRENDING_HOURS = int(os.getenv('TRENDING_HOURS', 24))
+TRENDING_BUCKET = int(os.getenv('TRENDING_BUCKET', 60 * 60))
+TRENDING_SIZE = int(os.getenv('TRENDING_SIZE', 20))
+TRENDING_REFRESH = int(os.getenv('TRENDING_REFRESH', 60))
+
+# RSS/Atom feeds: latest FEED_SIZE posts, kept until the next change
+FEED_SIZE = int(os.getenv('FEED_SIZE', 20))
+FEED_DESCRIPTION_WORDS = int(os.getenv('FEED_DESCRIPTION_WORDS', 50))
+FEED_CACHE_TIMEOUT = int(os.getenv('FEED_CACHE_TIMEOUT', 60 * 60))
+# Seconds aggregators and proxies may reuse a feed without asking
+FEED_MAX_AGE = int(os.getenv('FEED_MAX_AGE', 60))
+
+# Sitemaps written by generate_sitemaps, served by nginx at /sitemap.xml
+SITEMAP_ROOT = os.getenv('SITEMAP_ROOT', str(BASE_DIR / 'sitemaps'))
+SITEMAP_BASE_URL = os.getenv('SITEMAP_BASE_URL', 'http://localhost:8000')
+# Primary keys per shard; the protocol allows at most 50 000 URLs a file
+SITEMAP_SHARD_SIZE = int(os.getenv('SITEMAP_SHARD_SIZE', 50000))
+SITEMAP_CHUNK_SIZE = int(os.getenv('SITEMAP_CHUNK_SIZE', 5000))
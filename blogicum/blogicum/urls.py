@@ -17,8 +17,9 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import include, path, reverse_lazy
+from django.urls import include, path, re_path, reverse_lazy
 from django.views.generic.edit import CreateView
+from django.views.static import serve
 
 handler403 = 'pages.views.csrf_failure'
 handler404 = 'pages.views.page_not_found'
@@ -43,3 +44,7 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # nginx serves these in production
+    urlpatterns.append(re_path(
+        r'^(?P<path>sitemap(-[a-z]+-\d+)?\.xml)$', serve,
+        {'document_root': settings.SITEMAP_ROOT}))
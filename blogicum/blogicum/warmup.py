@@ -0,0 +1,51 @@
+"""Work done before and right after gunicorn forks, see gunicorn.conf.py"""
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from blog.search_engine import shared_index
+
+logger = logging.getLogger(__name__)
+
+
+def project_templates():
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for path in sorted(Path(directory).rglob('*.html')):
+            yield path.relative_to(directory).as_posix()
+
+
+def warm_master():
+    """Import URLconf and compile templates once, workers share the pages"""
+    get_resolver().url_patterns
+    compiled = 0
+    for name in project_templates():
+        try:
+            get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            logger.warning('Template %s not precompiled', name, exc_info=True)
+        else:
+            compiled += 1
+    if connections['default'].vendor != 'postgresql':
+        # Mapped before the fork: workers share the snapshot pages.
+        shared_index()
+    # A connection must never be shared by forked workers.
+    connections.close_all()
+    return compiled
+
+
+def warm_worker(connect=True):
+    """Connect to the cache, and the database, before the first request
+
+    Django connections are per thread: ``connect`` only when the requests
+    are served by this thread, else the connection would sit idle.
+    """
+    if connect:
+        for connection in connections.all():
+            connection.ensure_connection()
+    cache.get('warmup')
@@ -0,0 +1,150 @@
+"""Gunicorn settings: `gunicorn -c gunicorn.conf.py` (picked up by default)
+
+Every value can be overridden with the GUNICORN_* variables below.
+"""
+import multiprocessing
+import os
+
+ASYNC_VIEWS = bool(int(os.getenv('ASYNC_VIEWS', 0)))
+# Resident size of one worker with Django, templates and the locmem cache.
+WORKER_MEMORY_MB = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', 150))
+# Memory left to the OS page cache, nginx and the gunicorn master.
+RESERVED_MEMORY_MB = int(os.getenv('GUNICORN_RESERVED_MEMORY_MB', 256))
+# One more request thread in a worker: its stack and response buffers.
+THREAD_MEMORY_MB = int(os.getenv('GUNICORN_THREAD_MEMORY_MB', 16))
+
+
+def memory_limit_mb():
+    """Memory limit of the container cgroup, else of the host"""
+    for path in ('/sys/fs/cgroup/memory.max',
+                 '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as limit:
+                value = limit.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number.
+        if value != 'max' and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        return (os.sysconf('SC_PAGE_SIZE')
+                * os.sysconf('SC_PHYS_PAGES')) // (1024 * 1024)
+    except (ValueError, OSError):
+        return None
+
+
+def cpu_limit():
+    """Number of CPUs to use: the affinity mask, capped by the cgroup quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+    for quota_path, period_path in (
+            ('/sys/fs/cgroup/cpu.max', None),
+            ('/sys/fs/cgroup/cpu/cpu.cfs_quota_us',
+             '/sys/fs/cgroup/cpu/cpu.cfs_period_us')):
+        try:
+            with open(quota_path) as limit:
+                quota, *period = limit.read().split()
+            if period_path is not None:
+                with open(period_path) as limit:
+                    period = limit.read().split()
+        except OSError:
+            continue
+        # cgroup v2 reports "no limit" as max, v1 as -1.
+        if quota != 'max' and int(quota) > 0:
+            return max(1, min(cpus, -(-int(quota) // int(period[0]))))
+    return cpus
+
+
+def concurrency():
+    """Requests served at once: 2 * CPU + 1"""
+    return cpu_limit() * 2 + 1
+
+
+def default_workers():
+    """2 * CPU + 1, as many as fit in memory, at least one"""
+    workers = concurrency()
+    memory = memory_limit_mb()
+    if memory is not None:
+        workers = min(
+            workers, (memory - RESERVED_MEMORY_MB) // WORKER_MEMORY_MB)
+    return max(1, workers)
+
+
+def default_threads(workers):
+    """Threads making up for the workers memory had no room for
+
+    A thread costs far less than a worker, so a container too small for
+    2 * CPU + 1 workers still serves as many requests at once, as long as
+    the threads fit in the memory the workers left.
+    """
+    threads = -(-concurrency() // workers)
+    memory = memory_limit_mb()
+    if memory is not None:
+        spare = memory - RESERVED_MEMORY_MB - workers * WORKER_MEMORY_MB
+        threads = min(threads, 1 + max(0, spare) // (
+            workers * THREAD_MEMORY_MB))
+    return max(1, threads)
+
+
+wsgi_app = 'blogicum.asgi:application' if ASYNC_VIEWS else (
+    'blogicum.wsgi:application')
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:7000')
+workers = int(os.getenv('GUNICORN_WORKERS', 0)) or default_workers()
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS',
+    'uvicorn_worker.UvicornWorker' if ASYNC_VIEWS else 'sync')
+# More than one thread switches sync workers to gthread; uvicorn workers
+# run the views in ASYNC_VIEW_THREADS instead.
+threads = int(os.getenv('GUNICORN_THREADS', 0)) or (
+    default_threads(workers) if worker_class == 'sync' else 1)
+# Only a single-threaded sync worker queries from its main thread: any
+# other opens connections in the threads serving the requests.
+CONNECT_ON_BOOT = worker_class == 'sync' and threads == 1
+
+# Django, the URLconf and compiled templates are loaded once in the master
+# and shared copy-on-write by the workers (see when_ready).
+preload_app = True
+# Recycle workers now and then to contain slow leaks; the jitter keeps them
+# from restarting all at once.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Longer than nginx keeps idle upstream connections (keepalive_timeout
+# 60s), so gunicorn never closes one nginx is about to reuse. Sync workers
+# close after every response anyway; gthread and uvicorn keep them.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+# Request bodies are buffered by nginx; a small backlog sheds load early.
+backlog = int(os.getenv('GUNICORN_BACKLOG', 512))
+# X-Forwarded-* headers are trusted from these addresses only; list the
+# proxy's address (or '*' behind a private network) to widen it.
+forwarded_allow_ips = os.getenv(
+    'GUNICORN_FORWARDED_ALLOW_IPS', '127.0.0.1')
+accesslog = os.getenv('GUNICORN_ACCESSLOG', None)
+errorlog = '-'
+
+
+def when_ready(server):
+    from blogicum.warmup import warm_master
+
+    server.log.info('Precompiled %d templates', warm_master())
+
+
+def post_worker_init(worker):
+    from blogicum.warmup import warm_worker
+
+    try:
+        warm_worker(connect=CONNECT_ON_BOOT)
+    except Exception:
+        # The first request reconnects; never keep a worker from booting.
+        worker.log.exception('Worker warm-up failed')
+
+
+def worker_exit(server, worker):
+    from blogicum.db.postgresql.base import pool_stats
+
+    for alias, stats in pool_stats().items():
+        server.log.info('DB pool %s of worker %s: %s', alias, worker.pid,
+                        stats)
@@ -0,0 +1,57 @@
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+
+from blog import async_views
+from blog.middleware import QueryBudgetMiddleware
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor():
+    """Pool threads keep their connections: end them with the test"""
+    yield
+    async_views.executor().shutdown(wait=True)
+    async_views._executor = None
+
+
+def _get(view, path, user, **kwargs):
+    request = AsyncRequestFactory().get(path)
+    request.user = user
+    middleware = QueryBudgetMiddleware(
+        lambda request: view(request, **kwargs))
+    return async_to_sync(middleware.__acall__)(request)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_render_in_the_pool(user, post_with_published_location):
+    post = post_with_published_location
+    cases = [
+        (async_views.post_list, "/", AnonymousUser(), {}),
+        (async_views.category_post_list, "/category/", AnonymousUser(),
+         {"category_slug": post.category.slug}),
+        (async_views.profile_detail, "/profile/", user,
+         {"username": user.username}),
+        (async_views.post_detail, f"/posts/{post.pk}/", user,
+         {"pk": post.pk}),
+    ]
+    for view, path, request_user, kwargs in cases:
+        response = _get(view, path, request_user, **kwargs)
+        assert response.status_code == 200, view
+        assert response.is_rendered
+        # Queries ran on a pool thread and were still counted.
+        queries = int(SERVER_TIMING_QUERIES.search(
+            response["Server-Timing"]).group(1))
+        assert queries > 0, view
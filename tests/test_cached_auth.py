@@ -0,0 +1,73 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.cache import user_cache_key
+
+
+@pytest.fixture(autouse=True)
+def user_cache(settings):
+    settings.USER_CACHE_TIMEOUT = 300
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _user_queries(client, url="/posts/create/"):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    return response, [
+        query["sql"] for query in captured.captured_queries
+        if 'FROM "auth_user"' in query["sql"]
+    ]
+
+
+@pytest.mark.django_db
+def test_user_loaded_from_cache(user_client):
+    _, queries = _user_queries(user_client)
+    assert len(queries) == 1
+    response, queries = _user_queries(user_client)
+    assert response.status_code == 200
+    assert queries == []
+
+
+@pytest.mark.django_db
+def test_profile_edit_and_password_change_drop_cached_user(user, user_client):
+    user_client.get("/posts/create/")
+    user_client.post("/profile/edit_profile/", {
+        "first_name": "Новое", "last_name": "Имя",
+        "username": user.username, "email": "new@example.com",
+    })
+    assert cache.get(user_cache_key(user.pk)) is None
+
+    user_client.get("/posts/create/")
+    user.set_password("another-password")
+    user.save()
+    response = user_client.get("/posts/create/")
+    assert response.status_code == 302  # old session no longer valid
+
+
+@pytest.mark.django_db
+def test_sessions_of_the_plain_backend_stay_logged_in(user, client):
+    client.force_login(
+        user, backend="django.contrib.auth.backends.ModelBackend")
+    assert client.get("/posts/create/").status_code == 200
+
+
+@pytest.mark.django_db
+def test_purge_sessions_in_batches():
+    for _ in range(3):
+        SessionStore().create()
+    Session.objects.update(expire_date=timezone.now() - timedelta(days=1))
+    SessionStore().create()  # still valid
+
+    call_command("purge_sessions", batch_size=2, pause=0, stdout=StringIO())
+    assert Session.objects.count() == 1
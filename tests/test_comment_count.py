@@ -0,0 +1,81 @@
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+
+from blog.cache import current_generations, render_post_cards
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_comments(mixer, post_with_published_location):
+    post = post_with_published_location
+    assert post.comment_count == 0
+
+    comments = mixer.cycle(3).blend("blog.Comment", post=post)
+    post.refresh_from_db()
+    assert post.comment_count == 3
+
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+    other_post = mixer.blend("blog.Post")
+    comments[1].post = other_post
+    comments[1].save()
+    post.refresh_from_db()
+    other_post.refresh_from_db()
+    assert (post.comment_count, other_post.comment_count) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_recount_comments_command(mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    type(post).objects.update(comment_count=42)
+
+    stale = type(post).objects.get(pk=post.pk)
+    assert "Комментарии (42)" in render_post_cards([stale])[0]
+    generations = current_generations(["all"])
+
+    call_command("recount_comments", batch_size=1)
+
+    post.refresh_from_db()
+    assert post.comment_count == 2
+    assert current_generations(["all"]) != generations
+    assert "Комментарии (2)" in render_post_cards([post])[0]
+
+
+@pytest.mark.django_db
+def test_post_delete_does_not_uncount_each_comment(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(5).blend("blog.Comment", post=post)
+    with CaptureQueriesContext(connection) as captured:
+        post.delete()
+    updates = [query["sql"] for query in captured.captured_queries
+               if query["sql"].startswith("UPDATE")]
+    assert updates == []
+    assert not type(post).objects.filter(pk=post.pk).exists()
+
+
+@pytest.mark.django_db
+def test_failed_post_delete_leaves_counting_on(
+        mixer, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(2).blend("blog.Comment", post=post)
+
+    def fail(sender, **kwargs):
+        raise DatabaseError("delete failed")
+
+    # Fails while the comments go, before the post itself is deleted.
+    post_delete.connect(fail, sender=type(comments[0]))
+    try:
+        with pytest.raises(DatabaseError), transaction.atomic():
+            post.delete()
+    finally:
+        post_delete.disconnect(fail, sender=type(comments[0]))
+
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1
@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import N_PER_PAGE
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location):
+    return mixer.cycle(N_PER_PAGE * 2 + 3).blend(
+        "blog.Comment", post=post_with_published_location)
+
+
+@pytest.mark.django_db
+def test_detail_shows_first_batch_and_fragment_the_rest(
+        user_client, post_with_published_location, many_comments):
+    post = post_with_published_location
+    response = user_client.get(f"/posts/{post.pk}/")
+    page = response.context["comments"]
+    seen = [comment.pk for comment in page]
+    assert len(seen) == N_PER_PAGE
+    while page.has_next():
+        response = user_client.get(
+            f"/posts/{post.pk}/comments/?after={page.next_cursor}")
+        assert [t.name for t in response.templates][0] == (
+            "includes/comment_list.html")
+        page = response.context["comments"]
+        seen += [comment.pk for comment in page]
+    assert seen == [comment.pk for comment in many_comments]
+
+
+@pytest.mark.django_db
+def test_fragment_follows_post_visibility(
+        another_user_client, mixer, user, published_category):
+    hidden = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=False)
+    response = another_user_client.get(f"/posts/{hidden.pk}/comments/")
+    assert response.status_code == 404
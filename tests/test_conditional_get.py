@@ -0,0 +1,87 @@
+import pytest
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _revalidate(client, url, etag, **headers):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+    return response, captured
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("logged_in", [False, True])
+def test_unchanged_pages_answer_not_modified(
+        logged_in, client, user_client, post_with_published_location):
+    http_client = user_client if logged_in else client
+    post = post_with_published_location
+    urls = ["/", f"/category/{post.category.slug}/",
+            f"/profile/{post.author.username}/"]
+    if logged_in:
+        urls.append(f"/posts/{post.pk}/")
+    for url in urls:
+        response = http_client.get(url)
+        assert response.status_code == 200, url
+        assert "no-cache" in response["Cache-Control"]
+        assert response["Last-Modified"]
+        revalidated, captured = _revalidate(
+            http_client, url, response["ETag"])
+        assert revalidated.status_code == 304, url
+        assert revalidated.content == b""
+        assert revalidated["ETag"] == response["ETag"]
+        assert revalidated.templates == []
+        assert len(captured.captured_queries) <= 4, url
+
+
+@pytest.mark.django_db
+def test_comment_and_edit_change_validators(
+        mixer, user, user_client, post_with_published_location):
+    post = post_with_published_location
+    urls = ["/", f"/posts/{post.pk}/"]
+    etags = {url: user_client.get(url)["ETag"] for url in urls}
+
+    mixer.blend("blog.Comment", post=post, author=user)
+    for url in urls:
+        response, _ = _revalidate(user_client, url, etags[url])
+        assert response.status_code == 200, url
+        assert response["ETag"] != etags[url]
+        etags[url] = response["ETag"]
+
+    post.title = "Новый заголовок"
+    post.save()
+    for url in urls:
+        response, _ = _revalidate(user_client, url, etags[url])
+        assert response.status_code == 200, url
+        assert "Новый заголовок" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_validators_are_per_user(
+        user_client, another_user_client, post_with_published_location):
+    url = f"/posts/{post_with_published_location.pk}/"
+    etag = user_client.get(url)["ETag"]
+    response, _ = _revalidate(another_user_client, url, etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_validators_follow_the_representation(
+        mixer, user, user_client, post_with_published_location):
+    assert user_client.get("/")["ETag"] != user_client.get(
+        "/?page=1")["ETag"]
+    # The posts of ?page=last are unknown before paginating.
+    response = user_client.get("/?page=last")
+    assert response.status_code == 200
+    assert not response.has_header("ETag")
+    mixer.blend("blog.Comment", post=post_with_published_location,
+                author=user)
+    response = user_client.get("/?page=last", HTTP_IF_NONE_MATCH="*")
+    assert response.status_code == 200
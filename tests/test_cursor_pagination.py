@@ -0,0 +1,61 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from conftest import N_PER_PAGE
+
+
+@pytest.fixture
+def many_posts(mixer, user, published_category):
+    now = timezone.now()
+    # Two posts per timestamp to exercise the (pub_date, id) tie-breaker.
+    dates = (now - timedelta(hours=i // 2) for i in range(N_PER_PAGE * 2 + 5))
+    return mixer.cycle(N_PER_PAGE * 2 + 5).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=dates,
+    )
+
+
+def _page_ids(response):
+    return [post.id for post in response.context["page_obj"]]
+
+
+@pytest.mark.django_db
+def test_cursor_walks_whole_feed(client, many_posts):
+    expected = [
+        post.id for post in sorted(
+            many_posts, key=lambda p: (p.pub_date, p.id), reverse=True)
+    ]
+    seen = []
+    response = client.get("/?after=")
+    assert response.status_code == HTTPStatus.OK
+    while True:
+        seen += _page_ids(response)
+        page = response.context["page_obj"]
+        if not page.has_next():
+            break
+        response = client.get(f"/?after={page.next_cursor}")
+    assert seen == expected
+
+    back = client.get(f"/?before={page.previous_cursor}")
+    assert _page_ids(back) == expected[N_PER_PAGE:N_PER_PAGE * 2]
+
+
+@pytest.mark.django_db
+def test_cursor_page_has_no_count_query(
+        client, many_posts, django_assert_max_num_queries):
+    first = client.get("/?after=")
+    cursor = first.context["page_obj"].next_cursor
+    with django_assert_max_num_queries(2) as captured:
+        client.get(f"/?after={cursor}")
+    assert not any("COUNT(*)" in q["sql"] for q in captured.captured_queries)
+
+
+@pytest.mark.django_db
+def test_bad_cursor_is_404(client, many_posts):
+    assert client.get("/?after=garbage").status_code == HTTPStatus.NOT_FOUND
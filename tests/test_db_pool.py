@@ -0,0 +1,59 @@
+import threading
+
+import psycopg2
+import pytest
+from django.db import connection
+
+from blogicum.db.postgresql.pool import ConnectionPool, PoolTimeout
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql",
+    reason="pools live PostgreSQL connections")
+
+
+def _connect():
+    return psycopg2.connect(**connection.get_connection_params())
+
+
+@pytest.mark.django_db
+def test_pool_reuses_bounds_and_counts():
+    pool = ConnectionPool(max_size=1, timeout=0.1, check_after=0)
+    first = pool.acquire(_connect)
+    errors = []
+    waiter = threading.Thread(
+        target=lambda: errors.append(pytest.raises(
+            PoolTimeout, pool.acquire, _connect)))
+    waiter.start()
+    waiter.join()
+    assert errors
+
+    pool.release(first)
+    assert pool.acquire(_connect) is first  # pinged, still healthy
+    first.close()
+    pool.release(first)
+    second = pool.acquire(_connect)
+    assert second is not first
+    pool.release(second)
+    pool.close()
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 4
+    assert stats["opened"] == 2
+    assert stats["waits"] == stats["timeouts"] == 1
+    assert stats["discarded"] == 1
+    assert stats["size"] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dead_connection_replaced_before_use():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        dead_pid = cursor.fetchone()[0]
+    with _connect() as killer, killer.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", [dead_pid])
+
+    # What a request start does; the next query gets a working connection.
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        assert cursor.fetchone()[0] != dead_pid
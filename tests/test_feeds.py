@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def category(mixer):
+    return mixer.blend("blog.Category", is_published=True)
+
+
+def _post(mixer, category, **kwargs):
+    kwargs.setdefault("pub_date", timezone.now() - timedelta(hours=1))
+    kwargs.setdefault("is_published", True)
+    return mixer.blend("blog.Post", category=category, **kwargs)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/feeds/rss/", "/feeds/atom/"])
+def test_site_feed_lists_published_posts(client, mixer, category, url):
+    post = _post(mixer, category, title="Видно всем")
+    _post(mixer, category, title="Черновик", is_published=False)
+    response = client.get(url)
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert post.title in content
+    assert "Черновик" not in content
+    assert "ETag" in response and "Last-Modified" in response
+
+
+@pytest.mark.django_db
+def test_unchanged_feed_is_not_modified_without_queries(
+        client, mixer, category):
+    _post(mixer, category)
+    etag = client.get("/feeds/rss/")["ETag"]
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get("/feeds/rss/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert len(captured.captured_queries) == 0
+
+    new = _post(mixer, category, title="Свежая публикация")
+    response = client.get("/feeds/rss/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert new.title in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_category_and_author_feeds(client, mixer, category):
+    post = _post(mixer, category, title="В категории")
+    other = _post(mixer, mixer.blend("blog.Category", is_published=True),
+                  title="В другой")
+    content = client.get(f"/category/{category.slug}/rss/").content.decode()
+    assert post.title in content and other.title not in content
+
+    url = f"/profile/{post.author.username}/atom/"
+    response = client.get(url)
+    assert post.title in response.content.decode()
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+    assert len(captured.captured_queries) == 1  # the author lookup
+
+    category.is_published = False
+    category.save()
+    assert client.get(f"/category/{category.slug}/rss/").status_code == 404
@@ -0,0 +1,102 @@
+import hashlib
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from blog.storage import blob_digest
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    settings.MEDIA_BLOB_GRACE = 0
+    return tmp_path
+
+
+def _photo(color="navy"):
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, "PNG")
+    return ContentFile(buffer.getvalue(), name="photo.png")
+
+
+def _blob_files(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, names in os.walk(root) for name in names)
+
+
+@pytest.mark.django_db
+def test_same_bytes_stored_once(media, mixer):
+    first = mixer.blend("blog.Post", image=_photo())
+    second = mixer.blend("blog.Post", image=_photo())
+    digest = hashlib.sha256(_photo().read()).hexdigest()
+    assert first.image.name == second.image.name == (
+        f"posts_images/{digest[:2]}/{digest[2:4]}/{digest}.png")
+    assert blob_digest(first.image.name) == digest
+    assert _blob_files(media) == [first.image.name]
+
+
+@pytest.mark.django_db
+def test_blob_released_with_its_last_post(
+        media, mixer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        first = mixer.blend("blog.Post", image=_photo())
+        second = mixer.blend("blog.Post", image=_photo())
+    name = first.image.name
+    assert len(_blob_files(media)) > 1  # renditions included
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert default_storage.exists(name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.image = _photo("red")
+        second.save()
+    assert not default_storage.exists(name)
+    assert all(blob_digest(path) != blob_digest(name)
+               for path in _blob_files(media))
+
+
+@pytest.mark.django_db
+def test_collect_media_removes_orphans(media, mixer):
+    post = mixer.blend("blog.Post", image=_photo())
+    orphan = default_storage.save("posts_images/orphan.png", _photo("red"))
+    legacy = default_storage.path("posts_images/legacy.png")
+    with open(legacy, "wb") as file:
+        file.write(b"legacy")
+
+    call_command("collect_media", stdout=open(os.devnull, "w"))
+    assert default_storage.exists(post.image.name)
+    assert not default_storage.exists(orphan)
+    assert os.path.exists(legacy)
+
+
+@pytest.mark.django_db
+def test_legacy_image_renditions_are_kept(media, mixer):
+    legacy = default_storage.path("posts_images/old.png")
+    os.makedirs(os.path.dirname(legacy))
+    with open(legacy, "wb") as file:
+        file.write(_photo().read())
+    post = mixer.blend("blog.Post", image="posts_images/old.png")
+    call_command("process_images", workers=1, stdout=open(os.devnull, "w"))
+    post.refresh_from_db()
+    files = [name for size in post.image_renditions["sizes"]
+             for name in size["files"].values()]
+    assert files and all(
+        name.startswith("posts_images/renditions/old_") for name in files)
+
+    call_command("collect_media", stdout=open(os.devnull, "w"))
+    assert all(default_storage.exists(name) for name in files)
+
+    # Stored as blobs before derived names were kept as given.
+    blob = default_storage.save("posts_images/card.png", _photo("red"))
+    post.image_renditions["sizes"][0]["files"]["png"] = blob
+    post.save(update_fields=["image_renditions"])
+    call_command("collect_media", stdout=open(os.devnull, "w"))
+    assert default_storage.exists(blob)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from blog.publication import (
+    NEXT_PUBLICATION_KEY, post_published, ttl_ceiling)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_anonymous_index_is_served_from_cache(
+        client, post_with_published_location, django_assert_num_queries):
+    client.get("/")
+    with django_assert_num_queries(0):
+        response = client.get("/")
+    assert post_with_published_location.title in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_comment_evicts_only_pages_with_the_post(
+        mixer, client, post_with_published_location, post_of_another_author,
+        django_assert_num_queries):
+    post = post_with_published_location
+    own_profile = f"/profile/{post.author.username}/"
+    other_profile = f"/profile/{post_of_another_author.author.username}/"
+    for url in ("/", own_profile, other_profile):
+        client.get(url)
+
+    mixer.blend("blog.Comment", post=post)
+
+    with django_assert_num_queries(0):
+        client.get(other_profile)
+    for url in ("/", own_profile):
+        assert "Комментарии (1)" in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_logged_in_users_bypass_cache(user_client, post_with_published_location):
+    user_client.get("/")
+    assert user_client.get("/").context is not None
+
+
+@pytest.mark.django_db
+def test_timeout_stops_at_next_scheduled_post(
+        mixer, user, published_category):
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(minutes=5))
+    assert 0 < ttl_ceiling(3600) <= 5 * 60 + 1
+
+
+@pytest.mark.django_db
+def test_crossing_publication_sends_signal_and_evicts(
+        mixer, client, user, published_category):
+    published = []
+
+    def receiver(sender, posts, **kwargs):
+        published.extend(posts)
+
+    post_published.connect(receiver)
+    try:
+        client.get("/")
+        post = mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            is_published=True, pub_date=timezone.now() + timedelta(hours=1))
+        # Pretend an hour has passed: the post is due now.
+        due = timezone.now() - timedelta(seconds=1)
+        type(post).objects.filter(pk=post.pk).update(pub_date=due)
+        cache.set(NEXT_PUBLICATION_KEY, due)
+        response = client.get("/")
+    finally:
+        post_published.disconnect(receiver)
+    assert published == [post]
+    assert post.title in response.content.decode()
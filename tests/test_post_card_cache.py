@@ -0,0 +1,58 @@
+import pytest
+from django.core.cache import cache
+
+CARD_TEMPLATE = "includes/post_card.html"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _rendered_cards(response):
+    return [t.name for t in response.templates].count(CARD_TEMPLATE)
+
+
+@pytest.mark.django_db
+def test_warm_index_skips_card_templates(
+        user_client, post_with_published_location):
+    assert _rendered_cards(user_client.get("/")) == 1
+    assert _rendered_cards(user_client.get("/")) == 0
+
+
+@pytest.mark.django_db
+def test_related_changes_invalidate_card(
+        mixer, user_client, post_with_published_location):
+    post = post_with_published_location
+    user_client.get("/")
+
+    mixer.blend("blog.Comment", post=post)
+    response = user_client.get("/")
+    assert _rendered_cards(response) == 1
+    assert "Комментарии (1)" in response.content.decode("utf-8")
+
+    post.category.title = "Переименованная категория"
+    post.category.save()
+    response = user_client.get("/")
+    assert _rendered_cards(response) == 1
+    assert "Переименованная категория" in response.content.decode("utf-8")
+
+    post.author.username = "renamed_author"
+    post.author.save()
+    response = user_client.get("/")
+    assert "@renamed_author" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_post_delete_evicts_once_for_all_comments(
+        monkeypatch, mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(5).blend("blog.Comment", post=post)
+    evicted = []
+    monkeypatch.setattr("blog.signals.forget_post_cards",
+                        lambda post_ids: evicted.append(set(post_ids)))
+    pk = post.pk
+    post.delete()
+    assert evicted == [{pk}]
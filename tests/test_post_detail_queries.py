@@ -0,0 +1,46 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# session + user + post with its relations + first comments batch
+DETAIL_QUERIES = 4
+# session + user + post lookup
+NOT_FOUND_QUERIES = 3
+
+
+@pytest.fixture
+def commented_post(mixer, post_with_published_location):
+    mixer.cycle(3).blend("blog.Comment", post=post_with_published_location)
+    return post_with_published_location
+
+
+@pytest.mark.django_db
+def test_owner_detail_queries(
+        user_client, commented_post, django_assert_num_queries):
+    commented_post.is_published = False
+    commented_post.save()
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = user_client.get(f"/posts/{commented_post.pk}/")
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_reader_detail_queries(
+        another_user_client, commented_post, django_assert_num_queries):
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = another_user_client.get(f"/posts/{commented_post.pk}/")
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_hidden_post_is_404_in_one_lookup(
+        another_user_client, commented_post):
+    commented_post.is_published = False
+    commented_post.save()
+    with CaptureQueriesContext(connection) as captured:
+        response = another_user_client.get(f"/posts/{commented_post.pk}/")
+    assert response.status_code == 404
+    post_queries = [
+        q for q in captured.captured_queries if "blog_post" in q["sql"]]
+    assert len(captured.captured_queries) == NOT_FOUND_QUERIES
+    assert len(post_queries) == 1
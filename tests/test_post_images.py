@@ -0,0 +1,73 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from blog.images import FORMATS
+
+
+@pytest.fixture
+def image_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    return settings
+
+
+def _upload(width=1600, height=900):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "teal").save(buffer, "JPEG")
+    return SimpleUploadedFile(
+        "photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.mark.django_db
+def test_renditions_built_after_commit(
+        image_settings, django_capture_on_commit_callbacks, user_client,
+        post_with_published_location):
+    post = post_with_published_location
+    post.image = _upload()
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        post.save()
+    # Renditions, and releasing the fixture image it replaced.
+    assert len(callbacks) == 2
+
+    post.refresh_from_db()
+    renditions = post.image_renditions
+    assert renditions["source"] == post.image.name
+    assert [size["width"] for size in renditions["sizes"]] == [320, 640, 1280]
+    assert [size["height"] for size in renditions["sizes"]] == [180, 360, 720]
+    for size in renditions["sizes"]:
+        assert set(size["files"]) == set(FORMATS)
+
+    content = user_client.get(f"/posts/{post.pk}/").content.decode("utf-8")
+    assert content.count("img-thumbnail") == 1
+    assert 'width="1280" height="720"' in content
+    assert " 320w" in content
+
+
+@pytest.mark.django_db
+def test_small_image_is_not_upscaled(
+        image_settings, django_capture_on_commit_callbacks,
+        post_with_published_location):
+    post = post_with_published_location
+    post.image = _upload(200, 100)
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    post.refresh_from_db()
+    assert [size["width"] for size in post.image_renditions["sizes"]] == [200]
+
+
+@pytest.mark.django_db
+def test_unchanged_image_is_not_reprocessed(
+        image_settings, django_capture_on_commit_callbacks,
+        post_with_published_location):
+    post = post_with_published_location
+    post.image = _upload()
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    post.refresh_from_db()
+    post.title = "Новый заголовок"
+    with django_capture_on_commit_callbacks() as callbacks:
+        post.save()
+    assert callbacks == []
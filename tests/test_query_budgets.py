@@ -0,0 +1,85 @@
+import re
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from blog.middleware import QueryBudgetExceeded
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(settings):
+    settings.QUERY_BUDGET_STRICT = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def own_comment(mixer, user, post_with_published_location):
+    return mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=user)
+
+
+def _cases(post, comment):
+    post_form = {
+        "title": "Заголовок",
+        "text": "Текст",
+        "category": post.category_id,
+        "pub_date": timezone.localtime().strftime("%Y-%m-%dT%H:%M"),
+    }
+    return [
+        ("blog:index", "get", "/", None),
+        ("blog:category_posts", "get",
+         f"/category/{post.category.slug}/", None),
+        ("blog:profile", "get", f"/profile/{post.author.username}/", None),
+        ("blog:post_detail", "get", f"/posts/{post.pk}/", None),
+        ("blog:comments", "get", f"/posts/{post.pk}/comments/", None),
+        ("blog:search", "get", "/search/", {"q": post.title}),
+        ("blog:trending", "get", "/trending/", None),
+        ("blog:create_post", "get", "/posts/create/", None),
+        ("blog:create_post", "post", "/posts/create/", post_form),
+        ("blog:edit_post", "get", f"/posts/{post.pk}/edit/", None),
+        ("blog:edit_post", "post", f"/posts/{post.pk}/edit/", post_form),
+        ("blog:add_comment", "post", f"/posts/{post.pk}/add_comment/",
+         {"text": "Комментарий"}),
+        ("blog:edit_comment", "get",
+         f"/posts/{post.pk}/edit_comment/{comment.pk}/", None),
+        ("blog:edit_comment", "post",
+         f"/posts/{post.pk}/edit_comment/{comment.pk}/", {"text": "Новый"}),
+        ("blog:delete_comment", "get",
+         f"/posts/{post.pk}/delete_comment/{comment.pk}/", None),
+        ("blog:delete_comment", "post",
+         f"/posts/{post.pk}/delete_comment/{comment.pk}/", None),
+        ("blog:edit_profile", "get", "/profile/edit_profile/", None),
+        ("blog:delete_post", "get", f"/posts/{post.pk}/delete/", None),
+        ("blog:delete_post", "post", f"/posts/{post.pk}/delete/", None),
+    ]
+
+
+@pytest.mark.django_db
+def test_every_blog_view_fits_its_budget(
+        user_client, client, post_with_published_location, own_comment):
+    """Logged in (worst case) and anonymous, always with a cold cache"""
+    cases = _cases(post_with_published_location, own_comment)
+    covered = {view_name for view_name, *_ in cases}
+    assert covered == set(settings.QUERY_BUDGETS)
+    for view_name, method, url, data in cases:
+        for http_client in (client, user_client):
+            cache.clear()
+            response = getattr(http_client, method)(url, data or {})
+            assert response.status_code < 500, (view_name, method, url)
+            queries = int(SERVER_TIMING_QUERIES.search(
+                response["Server-Timing"]).group(1))
+            assert queries <= settings.QUERY_BUDGETS[view_name], (
+                view_name, method, queries)
+
+
+@pytest.mark.django_db
+def test_strict_mode_fails_loudly(user_client, settings):
+    settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, "blog:index": 0}
+    with pytest.raises(QueryBudgetExceeded):
+        user_client.get("/")
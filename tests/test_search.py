@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from blog import search_engine
+from blog.search import search_in_process
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def in_process_index(settings, tmp_path):
+    """Without PostgreSQL every test starts from a fresh process index"""
+    settings.SEARCH_INDEX_PATH = str(tmp_path / "search_index.bin")
+    search_engine.reset()
+    yield
+    search_engine.reset()
+
+
+@pytest.fixture
+def category(mixer):
+    return mixer.blend("blog.Category", is_published=True)
+
+
+def _post(mixer, category, **kwargs):
+    kwargs.setdefault("pub_date", timezone.now() - timedelta(hours=1))
+    kwargs.setdefault("is_published", True)
+    return mixer.blend("blog.Post", category=category, **kwargs)
+
+
+@pytest.mark.django_db
+def test_search_stems_ranks_and_hides_unpublished(client, mixer, category):
+    in_title = _post(mixer, category, title="Путешествие на север",
+                     text="Было холодно.")
+    in_text = _post(mixer, category, title="Заметки",
+                    text="Мы <b>вспоминали</b> путешествия по рекам.")
+    _post(mixer, category, title="Путешествие", text="Черновик",
+          is_published=False)
+    _post(mixer, category, title="Путешествие", text="Позже",
+          pub_date=timezone.now() + timedelta(days=1))
+
+    response = client.get("/search/", {"q": "путешествий"})
+    assert response.status_code == 200
+    posts = list(response.context["page_obj"])
+    assert [post.pk for post in posts] == [in_title.pk, in_text.pk]
+    content = response.content.decode()
+    assert "<mark>путешествия</mark>" in content
+    assert "<b>вспоминали" not in content
+
+
+@pytest.mark.django_db
+def test_edited_post_is_reindexed(client, mixer, category,
+                                  django_capture_on_commit_callbacks):
+    post = _post(mixer, category, title="Осень", text="Листья")
+    client.get("/search/", {"q": "листья"})
+    post.text = "Первый снег"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    response = client.get("/search/", {"q": "снег"})
+    assert [p.pk for p in response.context["page_obj"]] == [post.pk]
+    response = client.get("/search/", {"q": "листья"})
+    assert list(response.context["page_obj"]) == []
+
+
+@pytest.mark.django_db
+def test_results_are_keyset_paginated(client, mixer, category):
+    posts = [
+        _post(mixer, category, title=f"Кофе {i}", text="кофе " * (i % 4))
+        for i in range(25)
+    ]
+    seen, after = [], None
+    while True:
+        response = client.get(
+            "/search/", {"q": "кофе", **({"after": after} if after else {})})
+        page = response.context["page_obj"]
+        seen += [post.pk for post in page]
+        if not page.has_next():
+            break
+        after = page.next_cursor
+    assert sorted(seen) == sorted(post.pk for post in posts)
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.django_db
+def test_in_process_fallback(mixer, category):
+    first = _post(mixer, category, title="Горы", text="горы и море")
+    second = _post(mixer, category, title="Море", text="тёплое море")
+    _post(mixer, category, title="Лес", text="тишина")
+    page = search_in_process("море", 1)
+    assert [post.pk for post in page] == [second.pk]
+    assert "<mark>море</mark>" in page[0].headline
+    page = search_in_process("море", 1, after=page.next_cursor)
+    assert [post.pk for post in page] == [first.pk]
+    assert not page.has_next()
+    assert [p.pk for p in search_in_process("теплое", 10)] == [second.pk]
+
+
+@pytest.mark.skipif(connection.vendor == "postgresql",
+                    reason="edits update the tsvector instead")
+@pytest.mark.django_db
+def test_other_processes_replay_logged_changes(
+        settings, mixer, category, django_capture_on_commit_callbacks):
+    settings.SHARED_CACHE = True
+    post = _post(mixer, category, title="Осень", text="Листья")
+    assert [p.pk for p in search_in_process("листья", 10)] == [post.pk]
+    # Saved by another process: this index only learns it from the log.
+    post.text = "Первый снег"
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert [p.pk for p in search_in_process("снег", 10)] == [post.pk]
+    assert list(search_in_process("листья", 10)) == []
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert search_engine.shared_index().search("снег") == []
@@ -0,0 +1,78 @@
+import pytest
+from django.utils import timezone
+
+from blog import search_engine
+from blog.search import search_in_process
+from blog.search_engine import SearchIndex, tokenize
+
+
+@pytest.fixture(autouse=True)
+def snapshot_path(settings, tmp_path):
+    settings.SEARCH_INDEX_PATH = str(tmp_path / "search_index.bin")
+    search_engine.reset()
+    yield settings.SEARCH_INDEX_PATH
+    search_engine.reset()
+
+
+def test_tokenizer_normalizes_cyrillic():
+    assert tokenize("Ёлки­палки, ЁЖ!") == tokenize("елкипалки еж")
+    assert tokenize("путешествие") == tokenize("путешествия")
+    assert tokenize("Café 42") == ["café", "42"]
+
+
+def test_bm25_ranking_and_incremental_updates():
+    index = SearchIndex.build([
+        (1, "Море", "Тёплое море и песок"),
+        (2, "Горы", "Горы, снег и море вдали"),
+        (3, "Лес", "Грибы"),
+    ])
+    assert [pk for _, pk in index.search("море")] == [1, 2]
+    index.add(3, "Море", "Море, море и море")
+    assert [pk for _, pk in index.search("море")][0] == 3
+    index.remove(1)
+    assert [pk for _, pk in index.search("море")] == [3, 2]
+    assert index.search("песок") == []
+    assert len(index) == 2
+
+
+def test_snapshot_roundtrip(snapshot_path):
+    rows = [(pk, f"Пост {pk}", "кофе " * (pk % 5) + "утро")
+            for pk in range(1, 300)]
+    built = SearchIndex.build(rows)
+    assert built.write(snapshot_path) == 299
+    loaded = SearchIndex.load(snapshot_path)
+    assert loaded.search("кофе") == built.search("кофе")
+    assert loaded.search("утро", limit=5) == built.search("утро", limit=5)
+    loaded.remove(7)
+    assert 7 not in {pk for _, pk in loaded.search("кофе")}
+    # The mapped postings are read-only: new documents go to the tail.
+    loaded.add(1000, "Кофе", "кофе кофе кофе")
+    assert loaded.search("кофе", limit=1)[0][1] == 1000
+    # Compaction drops retired docs from df: same order, not same scores.
+    loaded.write(snapshot_path + ".2")
+    reloaded = SearchIndex.load(snapshot_path + ".2")
+    assert [pk for _, pk in reloaded.search("кофе")] == [
+        pk for _, pk in loaded.search("кофе")]
+
+
+@pytest.mark.django_db
+def test_results_are_hydrated_through_published_posts(
+        mixer, snapshot_path, django_capture_on_commit_callbacks):
+    category = mixer.blend("blog.Category", is_published=True)
+    visible = mixer.blend(
+        "blog.Post", title="Рецепт ужина", text="ужин", category=category,
+        is_published=True, pub_date=timezone.now())
+    mixer.blend("blog.Post", title="Рецепт", text="черновик",
+                category=category, is_published=False)
+    assert [post.pk for post in search_in_process("рецепт", 10)] == [
+        visible.pk]
+
+    index = search_engine.shared_index()
+    with django_capture_on_commit_callbacks(execute=True):
+        search_engine.index_post(mixer.blend(
+            "blog.Post", title="Новый рецепт", text="рецепт рецепт",
+            category=category, is_published=True, pub_date=timezone.now()))
+        search_engine.unindex_post(visible.pk)
+    assert len(index) == 2
+    assert [post.title for post in search_in_process("рецепт", 10)] == [
+        "Новый рецепт"]
@@ -0,0 +1,83 @@
+import os
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.sitemaps import generate
+
+
+@pytest.fixture
+def sitemap_settings(settings):
+    settings.SITEMAP_BASE_URL = "https://example.com"
+    settings.SITEMAP_SHARD_SIZE = 2
+    return settings
+
+
+@pytest.fixture
+def category(mixer):
+    return mixer.blend("blog.Category", is_published=True, slug="travel")
+
+
+def _post(mixer, category, **kwargs):
+    kwargs.setdefault("pub_date", timezone.now() - timedelta(hours=1))
+    kwargs.setdefault("is_published", True)
+    return mixer.blend("blog.Post", category=category, **kwargs)
+
+
+def _read(root, name):
+    with open(root / name, encoding="utf-8") as file:
+        return file.read()
+
+
+def _posts(root):
+    return "".join(
+        _read(root, name) for name in os.listdir(root)
+        if name.startswith("sitemap-posts-"))
+
+
+@pytest.mark.django_db
+def test_index_lists_sharded_sitemaps(tmp_path, sitemap_settings, mixer,
+                                      category):
+    posts = [_post(mixer, category) for _ in range(3)]
+    hidden = _post(mixer, category, is_published=False)
+    generate(tmp_path)
+
+    index = _read(tmp_path, "sitemap.xml")
+    shards = [name for name in os.listdir(tmp_path)
+              if name.startswith("sitemap-")]
+    for name in shards:
+        assert f"<loc>https://example.com/{name}</loc>" in index
+    assert any(name.startswith("sitemap-categories-") for name in shards)
+    assert any(name.startswith("sitemap-profiles-") for name in shards)
+    content = _posts(tmp_path)
+    for post in posts:
+        assert f"<loc>https://example.com/posts/{post.pk}/</loc>" in content
+    assert f"/posts/{hidden.pk}/<" not in content
+    assert "https://example.com/category/travel/" in "".join(
+        _read(tmp_path, name) for name in shards)
+
+
+@pytest.mark.django_db
+def test_only_changed_shards_are_rewritten(tmp_path, sitemap_settings,
+                                           mixer, category):
+    posts = [_post(mixer, category) for _ in range(4)]
+    written, kept, removed = generate(tmp_path)
+    assert written and not kept and not removed
+    assert generate(tmp_path) == (0, written, 0)
+
+    shards = {}
+    for post in posts:
+        shards.setdefault(post.pk // 2, []).append(post)
+    number, (first, second) = next(
+        item for item in shards.items() if len(item[1]) == 2)
+    shard = f"sitemap-posts-{number}.xml"
+    second.is_published = False
+    second.save()
+    assert generate(tmp_path) == (1, written - 1, 0)
+    assert f"/posts/{second.pk}/" not in _read(tmp_path, shard)
+
+    first.delete()
+    assert generate(tmp_path) == (0, written - 1, 1)
+    assert not (tmp_path / shard).exists()
+    assert shard not in _read(tmp_path, "sitemap.xml")
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import CommentActivity
+from blog.trending import RANKING_KEY, trending_ranking, trending_scores
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def posts(mixer):
+    category = mixer.blend("blog.Category", is_published=True)
+    return mixer.cycle(3).blend(
+        "blog.Post", category=category, is_published=True,
+        pub_date=timezone.now() - timedelta(days=1))
+
+
+def _comment(mixer, post, count=1):
+    return mixer.cycle(count).blend("blog.Comment", post=post)
+
+
+@pytest.mark.django_db
+def test_ranking_follows_comments(mixer, posts):
+    first, second, hidden = posts
+    _comment(mixer, first, 2)
+    comments = _comment(mixer, second, 3)
+    _comment(mixer, hidden, 5)
+    hidden.is_published = False
+    hidden.save()
+    assert trending_ranking() == [(second.pk, 3), (first.pk, 2)]
+
+    for comment in comments[:2]:
+        comment.delete()
+    cache.delete(RANKING_KEY)
+    assert trending_ranking() == [(first.pk, 2), (second.pk, 1)]
+
+
+@pytest.mark.django_db
+def test_closed_buckets_are_read_once(mixer, posts, settings):
+    _comment(mixer, posts[0], 2)
+    now = timezone.now()
+    later = now + timedelta(seconds=settings.TRENDING_BUCKET)
+    assert trending_scores(now) == {posts[0].pk: 2}
+    assert trending_scores(later) == {posts[0].pk: 2}
+    with CaptureQueriesContext(connection) as captured:
+        assert trending_scores(later) == {posts[0].pk: 2}
+    assert len(captured.captured_queries) == 1  # the open bucket only
+    expired = now + timedelta(hours=settings.TRENDING_HOURS)
+    assert trending_scores(expired) == {}
+
+
+@pytest.mark.django_db
+def test_rebuild_and_compact(mixer, posts):
+    _comment(mixer, posts[1], 4)
+    CommentActivity.objects.all().delete()
+    CommentActivity.objects.create(
+        post=posts[0], bucket=timezone.now() - timedelta(days=30), count=7)
+    call_command("compact_trending", rebuild=True, stdout=StringIO())
+    assert list(CommentActivity.objects.values_list("post", "count")) == [
+        (posts[1].pk, 4)]
+
+
+@pytest.mark.django_db
+def test_trending_page(client, mixer, posts):
+    _comment(mixer, posts[2], 2)
+    response = client.get("/trending/")
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert posts[2].title in content
+    assert "Новых комментариев: 2" in content
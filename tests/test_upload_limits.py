@@ -0,0 +1,66 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Post
+
+
+@pytest.fixture
+def upload_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    return settings
+
+
+def _image(width=64, height=48, fmt="PNG"):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "orange").save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def _create(user_client, category, content, name="photo.png"):
+    return user_client.post("/posts/create/", {
+        "title": "Заголовок",
+        "text": "Текст",
+        "category": category.pk,
+        "pub_date": timezone.localtime().strftime("%Y-%m-%dT%H:%M"),
+        "image": SimpleUploadedFile(name, content),
+    })
+
+
+@pytest.mark.django_db
+def test_valid_image_is_saved(
+        upload_settings, user_client, published_category):
+    response = _create(user_client, published_category, _image())
+    assert response.status_code == 302
+    assert Post.objects.get().image.name
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("content, max_bytes, max_pixels", [
+    (b"<?php echo 'not an image'; ?>" * 100, 10 ** 6, 10 ** 6),
+    (_image(), 100, 10 ** 6),
+    (_image(200, 200), 10 ** 6, 200 * 200 - 1),
+])
+def test_rejected_upload_is_reported_on_the_form(
+        upload_settings, user_client, published_category,
+        content, max_bytes, max_pixels):
+    upload_settings.IMAGE_MAX_BYTES = max_bytes
+    upload_settings.IMAGE_MAX_PIXELS = max_pixels
+    response = _create(user_client, published_category, content)
+    assert response.status_code == 200
+    assert response.context["form"].errors["image"]
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+def test_dimensions_checked_from_header_only(
+        upload_settings, user_client, published_category):
+    """A declared 3000x3000 PNG is refused without decoding any pixels"""
+    upload_settings.IMAGE_MAX_PIXELS = 10 ** 6
+    header = _image(3000, 3000)[:4096]
+    response = _create(user_client, published_category, header)
+    assert "3000×3000" in response.context["form"].errors["image"][0]